@@ -2,11 +2,20 @@
 AI-powered ticket classification using Hugging Face models
 """
 
+import threading
+import numpy as np
 import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 
+from config import settings
+from keyword_matcher import get_keyword_matcher
+from model_registry import get_model_registry
+from models import TicketModel
+from semantic_search import get_search_engine
+from text_budget import chunk_text, fit_to_budget, pool_scores
+
 logger = logging.getLogger(__name__)
 
 class TicketClassifier:
@@ -14,13 +23,20 @@ class TicketClassifier:
     Ticket classifier using fine-tuned or zero-shot classification models
     """
     
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Using device: {self.device}")
+        # "torch" (eager PyTorch) or "onnx" (int8 ONNX Runtime on CPU)
+        self.backend = backend or settings.INFERENCE_BACKEND
+        logger.info(f"Using device: {self.device}, backend: {self.backend}")
         
         # Initialize models
         self._init_classifier()
         
+        # Cascade mode: embedding prototypes first, BART only for ambiguous texts
+        self.mode = settings.CLASSIFIER_MODE
+        self._prototypes = None
+        self._prototype_lock = threading.Lock()
+        
         # Auto-resolve patterns - ENHANCED with greetings
         self.auto_resolve_patterns = {
             "greeting": {
@@ -49,16 +65,29 @@ class TicketClassifier:
             }
         }
         
+        # Compile the keyword tables into the shared matcher
+        self.keyword_matcher = get_keyword_matcher()
+        self.keyword_matcher.add_rule("classifier.priority.high", self.high_priority_keywords)
+        self.keyword_matcher.add_rule("classifier.priority.medium", self.medium_priority_keywords)
+        for pattern_name, pattern_data in self.auto_resolve_patterns.items():
+            self.keyword_matcher.add_rule(f"classifier.auto_resolve.{pattern_name}", pattern_data["keywords"])
+        
         logger.info("Classifier initialized successfully!")
     
     def _init_classifier(self):
         # Initialize zero-shot classification pipeline for categories
         logger.info("Loading zero-shot classification model...")
-        self.category_classifier = pipeline(
-            "zero-shot-classification",
-            model="facebook/bart-large-mnli",
-            device=0 if self.device == "cuda" else -1
-        )
+        if self.backend == "onnx":
+            from onnx_backend import OnnxNLIModel
+            # Only the single-pass zero-shot path is available on ONNX
+            self.category_classifier = None
+            self.onnx_nli = OnnxNLIModel()
+        else:
+            self.category_classifier = pipeline(
+                "zero-shot-classification",
+                model="facebook/bart-large-mnli",
+                device=0 if self.device == "cuda" else -1
+            )
         
         # Category labels
         self.category_labels = [
@@ -69,6 +98,41 @@ class TicketClassifier:
             "other IT support"
         ]
         
+        # Map zero-shot label to category
+        self.label_to_category = {
+            "network and connectivity issues": "network",
+            "access and authentication problems": "access",
+            "hardware and equipment issues": "hardware",
+            "software and application issues": "software",
+            "other IT support": "other"
+        }
+        
+        self._init_fast_zero_shot()
+        
+        # Short descriptions per category, used to seed cascade prototypes
+        self.category_descriptions = {
+            "network": [
+                "network and connectivity issues",
+                "VPN, WiFi, internet or LAN connection is slow or failing"
+            ],
+            "access": [
+                "access and authentication problems",
+                "password reset, account locked, login failure or missing folder permissions"
+            ],
+            "hardware": [
+                "hardware and equipment issues",
+                "laptop, desktop, printer, monitor, keyboard or mouse is broken or faulty"
+            ],
+            "software": [
+                "software and application issues",
+                "application crashes, installation, license or update errors"
+            ],
+            "other": [
+                "other IT support",
+                "general IT request or question"
+            ]
+        }
+        
         # Priority keywords for rule-based priority detection
         self.high_priority_keywords = [
             "urgent", "critical", "emergency", "down", "not working", 
@@ -80,44 +144,280 @@ class TicketClassifier:
             "problem", "help", "support"
         ]
     
+    def _init_fast_zero_shot(self):
+        """
+        Prepare the single-pass zero-shot path: the NLI model/tokenizer from the
+        pipeline, the entailment logit index and the tokenized hypotheses, which
+        only depend on the (fixed) category labels and are cached here
+        """
+        if self.backend == "onnx":
+            self.nli_model = None
+            self.nli_tokenizer = self.onnx_nli.tokenizer
+            nli_config = self.onnx_nli.config
+        else:
+            self.nli_model = self.category_classifier.model
+            self.nli_tokenizer = self.category_classifier.tokenizer
+            nli_config = self.nli_model.config
+        # Same template the zero-shot pipeline uses by default
+        self.hypothesis_template = "This example is {}."
+        
+        # Same lookup the zero-shot pipeline performs
+        self.entailment_id = -1
+        for label, index in nli_config.label2id.items():
+            if label.lower().startswith("entail"):
+                self.entailment_id = index
+        
+        self._hypothesis_ids = [
+            self.nli_tokenizer(
+                self.hypothesis_template.format(label), add_special_tokens=False
+            )["input_ids"]
+            for label in self.category_labels
+        ]
+        self._max_pair_length = min(self.nli_tokenizer.model_max_length, 1024)
+    
     def classify_category(self, text: str) -> Tuple[str, float]:
         """
-        Classify ticket into category using zero-shot classification
+        Classify ticket into category
         Returns: (category, confidence)
         """
+        category, confidence, _ = self._classify_categories([text])[0]
+        return category, confidence
+    
+    def classify_category_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        Classify many tickets in one call
+        Returns: [(category, confidence), ...] in input order
+        """
+        return [(category, confidence) for category, confidence, _ in self._classify_categories(texts)]
+    
+    def _classify_categories(self, texts: List[str]) -> List[Tuple[str, float, str]]:
+        """
+        Route texts through the configured category classifier.
+        Returns: [(category, confidence, model_used), ...] where model_used is
+        "prototype" or "zero_shot"
+        """
+        if not texts:
+            return []
+        
+        if self.mode != "cascade":
+            return [(category, confidence, "zero_shot") for category, confidence in self._zero_shot_batch(texts)]
+        
+        results = self._prototype_batch(texts)
+        escalate = [i for i, result in enumerate(results) if result is None]
+        
+        if escalate:
+            zero_shot = self._zero_shot_batch([texts[i] for i in escalate])
+            for i, (category, confidence) in zip(escalate, zero_shot):
+                results[i] = (category, confidence, "zero_shot")
+        
+        logger.info(f"Cascade: {len(texts) - len(escalate)} by prototype, {len(escalate)} escalated to zero-shot")
+        return results
+    
+    def _zero_shot_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        Zero-shot classification of a batch of texts with BART-MNLI.
+        Long texts are reduced to CLASSIFIER_MAX_TOKENS first (LONG_TEXT_STRATEGY).
+        """
         try:
-            result = self.category_classifier(text, self.category_labels)
+            return [self._top_category(row) for row in self._budgeted_zero_shot_scores(texts)]
+        
+        except Exception as e:
+            logger.error(f"Classification error: {e}")
+            return [("other", 0.5) for _ in texts]
+    
+    def _budgeted_zero_shot_scores(self, texts: List[str]) -> np.ndarray:
+        """
+        Label distributions (texts, labels) with long inputs kept within the
+        token budget: "select" keeps the subject and most informative sentences,
+        "chunk" scores up to CLASSIFIER_MAX_CHUNKS chunks and pools the scores,
+        "truncate" only applies the hard token cap
+        """
+        max_tokens = settings.CLASSIFIER_MAX_TOKENS
+        strategy = settings.LONG_TEXT_STRATEGY
+        
+        if strategy == "chunk":
+            pieces, owners = [], []
+            for i, text in enumerate(texts):
+                for chunk in chunk_text(text, self.nli_tokenizer, max_tokens, settings.CLASSIFIER_MAX_CHUNKS):
+                    pieces.append(chunk)
+                    owners.append(i)
             
-            # Map label to category
-            label_to_category = {
-                "network and connectivity issues": "network",
-                "access and authentication problems": "access",
-                "hardware and equipment issues": "hardware",
-                "software and application issues": "software",
-                "other IT support": "other"
-            }
+            chunk_scores = self._zero_shot_scores(pieces)
+            owners = np.array(owners)
+            return np.vstack([
+                pool_scores(chunk_scores[owners == i], settings.CHUNK_POOLING)
+                for i in range(len(texts))
+            ])
+        
+        if strategy == "select":
+            texts = [fit_to_budget(text, self.nli_tokenizer, max_tokens) for text in texts]
+        return self._zero_shot_scores(texts)
+    
+    def _zero_shot_scores(self, texts: List[str]) -> np.ndarray:
+        if settings.CLASSIFIER_FAST_ZERO_SHOT or self.category_classifier is None:
+            return self._fast_zero_shot_scores(texts)
+        return self._pipeline_zero_shot_scores(texts)
+    
+    def _top_category(self, scores: np.ndarray) -> Tuple[str, float]:
+        """Best category and its score from one label distribution"""
+        best = int(np.argmax(scores))
+        category = self.label_to_category.get(self.category_labels[best], "other")
+        logger.debug(f"Classified as '{category}' with confidence {scores[best]:.2f}")
+        return category, float(scores[best])
+    
+    def _pipeline_zero_shot_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Reference path: the HF pipeline, batching premise/hypothesis pairs"""
+        return [self._top_category(row) for row in self._pipeline_zero_shot_scores(texts)]
+    
+    def _fast_zero_shot_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Single-pass path, see _fast_zero_shot_scores"""
+        return [self._top_category(row) for row in self._fast_zero_shot_scores(texts)]
+    
+    def _pipeline_zero_shot_scores(self, texts: List[str]) -> np.ndarray:
+        results = self.category_classifier(
+            list(texts),
+            self.category_labels,
+            batch_size=settings.CLASSIFIER_BATCH_SIZE
+        )
+        # The pipeline unwraps single-element inputs
+        if isinstance(results, dict):
+            results = [results]
+        
+        # The pipeline sorts labels by score; put them back in label order
+        scores = np.zeros((len(results), len(self.category_labels)), dtype=np.float32)
+        label_index = {label: j for j, label in enumerate(self.category_labels)}
+        for i, result in enumerate(results):
+            for label, score in zip(result['labels'], result['scores']):
+                scores[i, label_index[label]] = score
+        return scores
+    
+    def _fast_zero_shot_scores(self, texts: List[str]) -> np.ndarray:
+        """
+        Single-pass zero-shot path. Each premise is tokenized once and shared by
+        all of its (cached) hypotheses; all pairs of a ticket go through the model
+        together in one padded batch instead of one pipeline step per label.
+        Scores match the pipeline: softmax over the entailment logits.
+        """
+        tokenizer = self.nli_tokenizer
+        premises = tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        
+        # Hard ceiling on premise length, whatever the text reduction produced
+        premise_cap = settings.CLASSIFIER_MAX_TOKENS if settings.CLASSIFIER_MAX_TOKENS > 0 else self._max_pair_length
+        
+        # Whole tickets per forward pass, so all hypotheses of a ticket stay together
+        n_labels = len(self.category_labels)
+        texts_per_pass = max(1, settings.CLASSIFIER_BATCH_SIZE // n_labels)
+        # Group similar lengths to keep padding small; results are put back in order
+        order = sorted(range(len(texts)), key=lambda i: len(premises[i]))
+        
+        scores = np.zeros((len(texts), n_labels), dtype=np.float32)
+        for start in range(0, len(order), texts_per_pass):
+            chunk = order[start:start + texts_per_pass]
+            
+            rows = []
+            for i in chunk:
+                for hypothesis in self._hypothesis_ids:
+                    # truncation="only_first": trim the premise, never the hypothesis
+                    budget = self._max_pair_length - len(hypothesis) - tokenizer.num_special_tokens_to_add(pair=True)
+                    budget = min(budget, premise_cap)
+                    rows.append(tokenizer.build_inputs_with_special_tokens(premises[i][:budget], hypothesis))
             
-            top_label = result['labels'][0]
-            confidence = result['scores'][0]
-            category = label_to_category.get(top_label, "other")
+            width = max(len(row) for row in rows)
+            input_ids = torch.full((len(rows), width), tokenizer.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+            for r, row in enumerate(rows):
+                input_ids[r, :len(row)] = torch.tensor(row, dtype=torch.long)
+                attention_mask[r, :len(row)] = 1
             
-            logger.info(f"Classified as '{category}' with confidence {confidence:.2f}")
-            return category, confidence
+            logits = self._nli_logits(input_ids, attention_mask)
+            entail_logits = logits[:, self.entailment_id].reshape(len(chunk), n_labels)
+            scores[chunk] = torch.softmax(entail_logits.float(), dim=-1).numpy()
         
+        return scores
+    
+    def _nli_logits(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        """Run the NLI model and return its (rows, 3) logits"""
+        if self.backend == "onnx":
+            return torch.from_numpy(self.onnx_nli.logits(input_ids.numpy(), attention_mask.numpy()))
+        
+        with torch.inference_mode():
+            outputs = self.nli_model(
+                input_ids=input_ids.to(self.nli_model.device),
+                attention_mask=attention_mask.to(self.nli_model.device)
+            )
+        return outputs.logits.cpu()
+    
+    def _get_prototypes(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Build (once) one normalized MiniLM prototype per category from the label
+        descriptions and recent historical tickets of that category
+        """
+        if self._prototypes is None:
+            with self._prototype_lock:
+                if self._prototypes is None:
+                    self._prototypes = self._build_prototypes()
+        return self._prototypes
+    
+    def _build_prototypes(self) -> Tuple[List[str], np.ndarray]:
+        encoder = get_search_engine()
+        categories = list(self.category_descriptions.keys())
+        prototypes = []
+        
+        for category in categories:
+            examples = list(self.category_descriptions[category])
+            
+            if settings.CASCADE_HISTORY_TICKETS > 0:
+                try:
+                    history = TicketModel.get_recent_by_category(category, settings.CASCADE_HISTORY_TICKETS)
+                    examples.extend(f"{row['subject']}. {row['description']}" for row in history)
+                except Exception as e:
+                    logger.warning(f"Could not load historical tickets for '{category}' prototype: {e}")
+            
+            embeddings = encoder.encode_queries(examples)
+            prototype = embeddings.mean(axis=0)
+            prototypes.append(prototype / np.linalg.norm(prototype))
+            logger.info(f"Built '{category}' prototype from {len(examples)} examples")
+        
+        return categories, np.vstack(prototypes).astype(np.float32)
+    
+    def _prototype_batch(self, texts: List[str]) -> List[Optional[Tuple[str, float, str]]]:
+        """
+        Nearest-prototype classification. Texts whose top-2 similarity margin is
+        below CASCADE_MARGIN_THRESHOLD come back as None (to be escalated).
+        """
+        try:
+            categories, prototypes = self._get_prototypes()
+            embeddings = get_search_engine().encode_queries(texts)
         except Exception as e:
-            logger.error(f"Classification error: {e}")
-            return "other", 0.5
+            logger.error(f"Prototype classification error: {e}")
+            return [None for _ in texts]
+        
+        similarities = embeddings @ prototypes.T
+        results = []
+        for row in similarities:
+            order = np.argsort(row)[::-1]
+            margin = row[order[0]] - row[order[1]]
+            if margin < settings.CASCADE_MARGIN_THRESHOLD:
+                results.append(None)
+                continue
+            
+            # Softmax over scaled cosine similarities as a confidence estimate
+            scaled = np.exp((row - row[order[0]]) * settings.CASCADE_TEMPERATURE)
+            confidence = float(scaled[order[0]] / scaled.sum())
+            results.append((categories[order[0]], confidence, "prototype"))
+        
+        return results
     
     def classify_priority(self, text: str) -> Tuple[str, float]:
         """
         Classify ticket priority using keyword matching
         Returns: (priority, confidence)
         """
-        text_lower = text.lower()
+        hits = self.keyword_matcher.scan(text)
         
-        # Check for high priority keywords
-        high_matches = sum(1 for keyword in self.high_priority_keywords if keyword in text_lower)
-        medium_matches = sum(1 for keyword in self.medium_priority_keywords if keyword in text_lower)
+        # Count distinct high/medium priority keywords
+        high_matches = len(hits.get("classifier.priority.high", ()))
+        medium_matches = len(hits.get("classifier.priority.medium", ()))
         
         if high_matches > 0:
             confidence = min(0.7 + (high_matches * 0.1), 0.95)
@@ -133,13 +433,13 @@ class TicketClassifier:
         Check if the issue can be auto-resolved
         Returns: (can_auto_resolve, resolution_message)
         """
-        text_lower = text.lower()
+        hits = self.keyword_matcher.scan(text)
         
+        # First pattern (in table order) with any keyword hit wins
         for pattern_name, pattern_data in self.auto_resolve_patterns.items():
-            for keyword in pattern_data["keywords"]:
-                if keyword in text_lower:
-                    logger.info(f"Auto-resolve pattern matched: {pattern_name}")
-                    return True, pattern_data["message"]
+            if hits.get(f"classifier.auto_resolve.{pattern_name}"):
+                logger.info(f"Auto-resolve pattern matched: {pattern_name}")
+                return True, pattern_data["message"]
         
         return False, ""
     
@@ -147,7 +447,22 @@ class TicketClassifier:
         """
         Full classification: category, priority, and auto-resolve check
         """
-        category, cat_confidence = self.classify_category(text)
+        return self.classify_batch([text])[0]
+    
+    def classify_batch(self, texts: List[str]) -> List[Dict]:
+        """
+        Full classification for a list of texts.
+        Category inference runs as one batched pass; results are returned in
+        input order.
+        """
+        categories = self._classify_categories(texts)
+        return [
+            self._build_result(text, category, cat_confidence, model_used)
+            for text, (category, cat_confidence, model_used) in zip(texts, categories)
+        ]
+    
+    def _build_result(self, text: str, category: str, cat_confidence: float, model_used: str) -> Dict:
+        """Combine category output with rule-based priority and auto-resolve checks"""
         priority, pri_confidence = self.classify_priority(text)
         auto_resolve, resolution_message = self.check_auto_resolve(text)
         
@@ -159,15 +474,22 @@ class TicketClassifier:
             "priority": priority,
             "confidence": round(avg_confidence, 2),
             "auto_resolve": auto_resolve,
-            "resolution_message": resolution_message if auto_resolve else None
+            "resolution_message": resolution_message if auto_resolve else None,
+            "category_model": model_used
         }
 
-# Global classifier instance
-_classifier = None
+def _warm_up_classifier(classifier: TicketClassifier):
+    """Dummy inference so the first real request doesn't pay for buffer allocation"""
+    classifier.classify_batch(["Warm-up: VPN connection fails after password reset"])
+
+# Classifier instance is owned by the model registry (lazy, may be unloaded when idle)
+get_model_registry().register(
+    "classifier",
+    TicketClassifier,
+    size_mb=settings.CLASSIFIER_MODEL_SIZE_MB,
+    warmup=_warm_up_classifier
+)
 
 def get_classifier() -> TicketClassifier:
-    """Get or create classifier instance (singleton pattern)"""
-    global _classifier
-    if _classifier is None:
-        _classifier = TicketClassifier()
-    return _classifier
+    """Get classifier instance, loading it on first use"""
+    return get_model_registry().get("classifier")
@@ -0,0 +1,146 @@
+"""
+Async database connection pool (asyncpg) for the FastAPI endpoints.
+
+The psycopg2 pool in database.py blocks the event loop for every query; this
+pool lets one API worker keep many queries in flight. Sync code running in
+threads (search engine, classifier, scripts) keeps using database.py.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import asyncpg
+
+from config import settings
+
+# Async connection pool, created in the FastAPI lifespan
+async_pool: Optional[asyncpg.Pool] = None
+
+# Registry of named hot-path statements (name -> SQL), see PreparedConnection
+STATEMENTS: Dict[str, str] = {}
+
+def register_statement(name: str, sql: str) -> str:
+    """Add a named statement to the registry; returns the name"""
+    STATEMENTS[name] = sql
+    return name
+
+class PreparedConnection(asyncpg.Connection):
+    """
+    Connection that runs registered statements by name. asyncpg prepares each
+    distinct SQL text once per connection and keeps it in its statement cache
+    (statement_cache_size), so Postgres parses and plans each hot query once
+    per pooled connection instead of on every call. Statement objects are not
+    kept here: asyncpg invalidates them when the connection returns to the
+    pool. With DB_PREPARED_STATEMENTS off (e.g. behind PgBouncer in
+    transaction mode) the cache is disabled and the SQL runs unprepared.
+    """
+
+    async def _run_named(self, method: str, name: str, args) -> Any:
+        sql = STATEMENTS[name]
+        try:
+            return await getattr(self, method)(sql, *args)
+        except asyncpg.exceptions.InvalidCachedStatementError:
+            # Schema changed under the cached statement; asyncpg has dropped it.
+            # Inside a transaction Postgres has aborted it, so only retry outside one
+            if self.is_in_transaction():
+                raise
+            return await getattr(self, method)(sql, *args)
+
+    async def fetch_named(self, name: str, *args) -> List[asyncpg.Record]:
+        return await self._run_named("fetch", name, args)
+
+    async def fetchrow_named(self, name: str, *args) -> Optional[asyncpg.Record]:
+        return await self._run_named("fetchrow", name, args)
+
+    async def fetchval_named(self, name: str, *args) -> Any:
+        return await self._run_named("fetchval", name, args)
+
+async def init_async_pool(min_size: int = None, max_size: int = None) -> asyncpg.Pool:
+    """Initialize the async connection pool"""
+    global async_pool
+    if async_pool is None:
+        async_pool = await asyncpg.create_pool(
+            settings.DATABASE_URL,
+            min_size=settings.DB_POOL_MIN_SIZE if min_size is None else min_size,
+            max_size=settings.DB_POOL_MAX_SIZE if max_size is None else max_size,
+            command_timeout=settings.DB_COMMAND_TIMEOUT_SECONDS or None,
+            connection_class=PreparedConnection,
+            # asyncpg's own implicit statement cache (100 is its default)
+            statement_cache_size=100 if settings.DB_PREPARED_STATEMENTS else 0
+        )
+    return async_pool
+
+async def get_async_pool() -> asyncpg.Pool:
+    """Get the async connection pool"""
+    if async_pool is None:
+        await init_async_pool()
+    return async_pool
+
+async def close_async_pool():
+    """Close all pooled connections"""
+    global async_pool
+    if async_pool is not None:
+        await async_pool.close()
+        async_pool = None
+
+class UnitOfWork:
+    """
+    One pooled connection and transaction shared by every query of a
+    request. The connection is checked out on first use, so a request that
+    spends most of its time in model inference doesn't hold it meanwhile.
+    """
+
+    def __init__(self):
+        self._conn: Optional[asyncpg.Connection] = None
+        self._transaction = None
+
+    async def connection(self) -> asyncpg.Connection:
+        """The request's connection, checked out (and its transaction begun) on first call"""
+        if self._conn is None:
+            pool = await get_async_pool()
+            conn = await pool.acquire()
+            try:
+                transaction = conn.transaction()
+                await transaction.start()
+            except Exception:
+                await pool.release(conn)
+                raise
+            self._conn, self._transaction = conn, transaction
+        return self._conn
+
+    async def close(self, commit: bool = True):
+        """Commit (or roll back) and return the connection to the pool"""
+        if self._conn is None:
+            return
+        try:
+            if commit:
+                await self._transaction.commit()
+            else:
+                await self._transaction.rollback()
+        finally:
+            await (await get_async_pool()).release(self._conn)
+            self._conn, self._transaction = None, None
+
+async def get_unit_of_work() -> AsyncGenerator[UnitOfWork, None]:
+    """FastAPI dependency: request-scoped unit of work, committed if the request succeeds"""
+    uow = UnitOfWork()
+    try:
+        yield uow
+    except BaseException:
+        await uow.close(commit=False)
+        raise
+    await uow.close()
+
+@asynccontextmanager
+async def get_async_connection(uow: Optional[UnitOfWork] = None) -> AsyncGenerator[asyncpg.Connection, None]:
+    """
+    Async context manager for a connection inside a transaction: the unit of
+    work's when given (committed with the request), else a pooled one of its own
+    """
+    if uow is not None:
+        yield await uow.connection()
+        return
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            yield conn
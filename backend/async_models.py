@@ -0,0 +1,156 @@
+"""
+Async database models and operations (asyncpg), mirroring models.py
+"""
+
+from typing import List, Optional, Dict, Any
+from uuid import UUID
+from async_database import UnitOfWork, get_async_connection, register_statement
+from models import TICKET_STATUS_TRANSITION_SQL
+
+TICKET_COLUMNS = "id, source, employee, subject, description, priority, category, assigned_team, status, created_at, updated_at"
+
+# Hot queries, prepared once per pooled connection (see async_database.PreparedConnection)
+TICKET_CREATE = register_statement("ticket_create", f"""
+    INSERT INTO tickets (source, employee, subject, description, priority, category, assigned_team, status)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, 'open')
+    RETURNING {TICKET_COLUMNS}
+""")
+TICKET_GET_BY_ID = register_statement("ticket_get_by_id", f"""
+    SELECT {TICKET_COLUMNS}
+    FROM tickets
+    WHERE id = $1
+""")
+# One statement for every filter combination: an unset filter is NULL
+TICKET_LIST = register_statement("ticket_list", f"""
+    SELECT {TICKET_COLUMNS}
+    FROM tickets
+    WHERE ($1::text IS NULL OR LOWER(employee) LIKE LOWER($1))
+      AND ($2::text IS NULL OR status = $2)
+      AND ($3::text IS NULL OR category = $3)
+    ORDER BY created_at DESC
+    LIMIT $4
+""")
+TICKET_UPDATE_STATUS = register_statement("ticket_update_status", f"""
+    UPDATE tickets
+    SET status = $1, updated_at = CURRENT_TIMESTAMP
+    WHERE id = $2
+    RETURNING {TICKET_COLUMNS}
+""")
+TICKET_TRANSITION_STATUS = register_statement(
+    "ticket_transition_status", TICKET_STATUS_TRANSITION_SQL.format(ticket_id="$1", status="$2")
+)
+KB_SEARCH_BY_KEYWORDS = register_statement("kb_search_by_keywords", """
+    SELECT id, title, content, category, views, helpful_count
+    FROM knowledge_base
+    WHERE
+        (LOWER(title) LIKE LOWER($1) OR
+         LOWER(content) LIKE LOWER($1) OR
+         $2 = ANY(keywords))
+        AND ($3::text IS NULL OR category = $3)
+    ORDER BY helpful_count DESC, views DESC
+    LIMIT $4
+""")
+KB_GET_BY_ID = register_statement("kb_get_by_id", """
+    SELECT id, title, content, category, keywords, views, helpful_count, created_at
+    FROM knowledge_base
+    WHERE id = $1
+""")
+KB_INCREMENT_VIEWS = register_statement("kb_increment_views", """
+    UPDATE knowledge_base
+    SET views = views + 1
+    WHERE id = $1
+""")
+
+class AsyncTicketModel:
+    """Ticket database operations (async)"""
+
+    @staticmethod
+    async def create(
+        source: str,
+        employee: str,
+        subject: str,
+        description: str,
+        priority: str,
+        category: str,
+        assigned_team: Optional[str] = None,
+        uow: Optional[UnitOfWork] = None
+    ) -> Dict[str, Any]:
+        """Create a new ticket"""
+        async with get_async_connection(uow) as conn:
+            row = await conn.fetchrow_named(
+                TICKET_CREATE, source, employee, subject, description, priority, category, assigned_team
+            )
+
+            return dict(row)
+
+    @staticmethod
+    async def get_by_id(ticket_id: UUID, uow: Optional[UnitOfWork] = None) -> Optional[Dict[str, Any]]:
+        """Get ticket by ID"""
+        async with get_async_connection(uow) as conn:
+            row = await conn.fetchrow_named(TICKET_GET_BY_ID, ticket_id)
+
+            return dict(row) if row else None
+
+    @staticmethod
+    async def list_tickets(
+        employee: Optional[str] = None,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 50,
+        uow: Optional[UnitOfWork] = None
+    ) -> List[Dict[str, Any]]:
+        """List tickets with optional filters"""
+        async with get_async_connection(uow) as conn:
+            rows = await conn.fetch_named(
+                TICKET_LIST, f"%{employee}%" if employee else None, status or None, category or None, limit
+            )
+
+            return [dict(row) for row in rows]
+
+    @staticmethod
+    async def update_status(ticket_id: UUID, status: str, uow: Optional[UnitOfWork] = None) -> Optional[Dict[str, Any]]:
+        """Update ticket status"""
+        async with get_async_connection(uow) as conn:
+            row = await conn.fetchrow_named(TICKET_UPDATE_STATUS, status, ticket_id)
+
+            return dict(row) if row else None
+
+    @staticmethod
+    async def transition_status(
+        ticket_id: UUID,
+        status: str,
+        uow: Optional[UnitOfWork] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Set a ticket's status in one statement. The returned ticket also has
+        its previous `old_status`; None if the ticket doesn't exist.
+        """
+        async with get_async_connection(uow) as conn:
+            row = await conn.fetchrow_named(TICKET_TRANSITION_STATUS, ticket_id, status)
+
+            return dict(row) if row else None
+
+class AsyncKnowledgeBaseModel:
+    """Knowledge Base database operations (async)"""
+
+    @staticmethod
+    async def search_by_keywords(query: str, limit: int = 3, category: Optional[str] = None, uow: Optional[UnitOfWork] = None) -> List[Dict[str, Any]]:
+        """Search KB by keywords (simple text search), optionally within one category"""
+        async with get_async_connection(uow) as conn:
+            rows = await conn.fetch_named(KB_SEARCH_BY_KEYWORDS, f"%{query}%", query.lower(), category, limit)
+
+            return [dict(row) for row in rows]
+
+    @staticmethod
+    async def get_by_id(kb_id: UUID, uow: Optional[UnitOfWork] = None) -> Optional[Dict[str, Any]]:
+        """Get KB article by ID"""
+        async with get_async_connection(uow) as conn:
+            row = await conn.fetchrow_named(KB_GET_BY_ID, kb_id)
+
+            return dict(row) if row else None
+
+    @staticmethod
+    async def increment_views(kb_id: UUID, uow: Optional[UnitOfWork] = None):
+        """Increment view count for KB article"""
+        async with get_async_connection(uow) as conn:
+            await conn.fetchval_named(KB_INCREMENT_VIEWS, kb_id)
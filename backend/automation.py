@@ -5,6 +5,8 @@ Automation rules for ticket handling
 import logging
 from typing import Dict, Optional
 
+from keyword_matcher import get_keyword_matcher
+
 logger = logging.getLogger(__name__)
 
 class AutomationEngine:
@@ -71,29 +73,38 @@ class AutomationEngine:
                 'keywords': []
             }
         }
+        
+        # Compile the keyword tables into the shared matcher
+        self.keyword_matcher = get_keyword_matcher()
+        for rule_name, rule in self.auto_resolve_rules.items():
+            self.keyword_matcher.add_rule(f"automation.auto_resolve.{rule_name}", rule['keywords'])
+        self.keyword_matcher.add_rule("automation.escalation", self.escalation_rules['high_priority_keywords'])
+        for category, rule in self.assignment_rules.items():
+            self.keyword_matcher.add_rule(f"automation.category.{category}", rule['keywords'])
     
     def check_auto_resolve(self, text: str, category: str) -> Optional[Dict]:
         """
         Check if ticket can be auto-resolved based on rules
         Returns resolution info if auto-resolvable, None otherwise
         """
-        text_lower = text.lower()
+        hits = self.keyword_matcher.scan(text)
         
         for rule_name, rule in self.auto_resolve_rules.items():
             # Check if any keyword matches
-            for keyword in rule['keywords']:
-                if keyword in text_lower:
-                    # Verify category matches if specified
-                    if rule['category'] and rule['category'] != category:
-                        continue
-                    
-                    logger.info(f"Auto-resolve rule matched: {rule_name}")
-                    return {
-                        'can_resolve': True,
-                        'rule_name': rule_name,
-                        'resolution': rule['resolution'],
-                        'kb_article_id': rule['kb_article_id']
-                    }
+            if not hits.get(f"automation.auto_resolve.{rule_name}"):
+                continue
+            
+            # Verify category matches if specified
+            if rule['category'] and rule['category'] != category:
+                continue
+            
+            logger.info(f"Auto-resolve rule matched: {rule_name}")
+            return {
+                'can_resolve': True,
+                'rule_name': rule_name,
+                'resolution': rule['resolution'],
+                'kb_article_id': rule['kb_article_id']
+            }
         
         return None
     
@@ -101,12 +112,9 @@ class AutomationEngine:
         """
         Check if ticket should be escalated based on time and priority
         """
-        text_lower = text.lower()
-        
         # Check for high priority keywords
-        for keyword in self.escalation_rules['high_priority_keywords']:
-            if keyword in text_lower:
-                return True
+        if self.keyword_matcher.scan(text).get("automation.escalation"):
+            return True
         
         # Check time-based escalation
         escalation_time = self.escalation_rules['escalation_time'].get(priority, 72)
@@ -123,12 +131,12 @@ class AutomationEngine:
     
     def suggest_category(self, text: str) -> str:
         """Suggest category based on keywords"""
-        text_lower = text.lower()
+        hits = self.keyword_matcher.scan(text)
         
         # Count keyword matches for each category
         category_scores = {}
-        for category, rule in self.assignment_rules.items():
-            score = sum(1 for keyword in rule['keywords'] if keyword in text_lower)
+        for category in self.assignment_rules:
+            score = len(hits.get(f"automation.category.{category}", ()))
             if score > 0:
                 category_scores[category] = score
         
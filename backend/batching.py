@@ -0,0 +1,144 @@
+"""
+Dynamic micro-batching for concurrent model inference
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from config import settings
+from inference_pool import get_inference_pool
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for a short window and runs them as one batch.
+
+    Callers await `submit(item)`. The first request of a batch opens a window of
+    `max_wait_ms`; the batch is flushed when the window closes or `max_batch_size`
+    items are queued, whichever comes first. Each caller gets its own result back.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_concurrency: int = 1,
+        name: str = "batcher"
+    ):
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_concurrency = max(1, max_concurrency)
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = set()
+
+        # Simple counters for observability
+        self.batches_run = 0
+        self.items_processed = 0
+
+    def _ensure_started(self):
+        """Start the collector task on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._worker = asyncio.create_task(self._collect())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """Group queued items into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Bound the number of batches running at once; new requests keep
+            # queuing (and forming the next batch) while we wait for a slot.
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run the handler on one batch and resolve each caller's future"""
+        items = [item for item, _ in batch]
+        try:
+            results = await self.handler(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name} handler returned {len(results)} results for {len(items)} items"
+                )
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+            self.batches_run += 1
+            self.items_processed += len(items)
+            logger.debug(f"{self.name}: processed batch of {len(items)}")
+
+        except Exception as e:
+            logger.error(f"{self.name} batch error: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Stop the collector task"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def get_stats(self) -> dict:
+        """Return batching counters"""
+        return {
+            "batches_run": self.batches_run,
+            "items_processed": self.items_processed,
+            "avg_batch_size": round(self.items_processed / self.batches_run, 2) if self.batches_run else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+# Global classification batcher instance
+_classify_batcher = None
+
+def get_classify_batcher() -> MicroBatcher:
+    """Get or create the micro-batcher in front of TicketClassifier (singleton pattern)"""
+    global _classify_batcher
+    if _classify_batcher is None:
+        pool = get_inference_pool()
+        _classify_batcher = MicroBatcher(
+            pool.classify_batch,
+            max_batch_size=settings.MICROBATCH_MAX_SIZE,
+            max_wait_ms=settings.MICROBATCH_MAX_WAIT_MS,
+            # Keep every inference process busy with its own batch
+            max_concurrency=max(1, pool.workers),
+            name="classify_batcher"
+        )
+    return _classify_batcher
@@ -0,0 +1,56 @@
+"""
+Benchmark the single-pass zero-shot path against the HF pipeline path.
+Checks that both produce the same categories/scores and reports latency.
+"""
+
+import time
+from ai_classifier import get_classifier
+
+SAMPLE_TEXTS = [
+    "I cannot connect to VPN from home. Getting connection failed error.",
+    "My password has expired and I need to reset it urgently.",
+    "Laptop screen is flickering and sometimes goes black.",
+    "Need Microsoft Office license for new project.",
+    "Cannot access the shared drive S:\\Engineering folder.",
+    "WiFi on the 4th floor keeps dropping during video calls.",
+    "Outlook crashes every time I open a PDF attachment.",
+    "Printer in the control room is out of toner and shows error E13.",
+]
+
+def time_call(func, texts, repeats=3):
+    """Return (best seconds, last result) over a few repeats"""
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(texts)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def benchmark():
+    classifier = get_classifier()
+
+    # Warm up both paths
+    classifier._pipeline_zero_shot_batch(SAMPLE_TEXTS[:1])
+    classifier._fast_zero_shot_batch(SAMPLE_TEXTS[:1])
+
+    print("\n" + "="*60)
+    print("Zero-shot classification benchmark")
+    print("="*60)
+
+    for label, texts in [("single text", SAMPLE_TEXTS[:1]), (f"{len(SAMPLE_TEXTS)} texts", SAMPLE_TEXTS)]:
+        pipeline_time, pipeline_result = time_call(classifier._pipeline_zero_shot_batch, texts)
+        fast_time, fast_result = time_call(classifier._fast_zero_shot_batch, texts)
+
+        mismatches = sum(1 for a, b in zip(pipeline_result, fast_result) if a[0] != b[0])
+        max_score_diff = max(abs(a[1] - b[1]) for a, b in zip(pipeline_result, fast_result))
+
+        print(f"\n[{label}]")
+        print(f"  Pipeline:    {pipeline_time * 1000:.1f} ms")
+        print(f"  Single-pass: {fast_time * 1000:.1f} ms")
+        print(f"  Speedup:     {pipeline_time / fast_time:.2f}x")
+        print(f"  Category mismatches: {mismatches}")
+        print(f"  Max score difference: {max_score_diff:.6f}")
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,83 @@
+"""
+Benchmark the IVF index against exact search: recall@k and latency per nprobe.
+
+    python benchmark_search.py                 # KB embeddings from the database
+    python benchmark_search.py --synthetic 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from vector_index import ExactIndex, IVFIndex, measure_recall
+
+def load_vectors(synthetic: int, dims: int) -> np.ndarray:
+    if synthetic:
+        # Clustered random data, closer to real embeddings than uniform noise
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((max(1, synthetic // 500), dims)).astype(np.float32)
+        vectors = centers[rng.integers(0, len(centers), synthetic)]
+        vectors += 0.5 * rng.standard_normal(vectors.shape).astype(np.float32)
+    else:
+        from models import KnowledgeBaseModel
+        from semantic_search import to_vector
+        rows = KnowledgeBaseModel.get_all_with_embeddings()
+        vectors = np.asarray(
+            [v for v in (to_vector(row.get('embedding')) for row in rows) if v is not None],
+            dtype=np.float32
+        )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def benchmark(synthetic: int, dims: int, nlist: int, k: int, n_queries: int):
+    vectors = load_vectors(synthetic, dims)
+    if len(vectors) == 0:
+        print("No embeddings found")
+        return
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    keys = np.arange(len(vectors), dtype=np.int64)
+    exact = ExactIndex.from_arrays(keys, vectors)
+
+    start = time.perf_counter()
+    ivf = IVFIndex(vectors.shape[1], nlist=nlist)
+    ivf.train(vectors)
+    ivf.add(keys, vectors)
+    build_time = time.perf_counter() - start
+
+    print("\n" + "="*60)
+    print(f"KB search index benchmark: {len(vectors)} vectors, {len(queries)} queries, k={k}")
+    print("="*60)
+    print(f"IVF build: {build_time:.2f}s, {ivf.nlist} lists")
+
+    start = time.perf_counter()
+    for query in queries:
+        exact.search(query[None, :], k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"\n  exact          {exact_ms:7.2f} ms/query  recall 1.000")
+
+    for nprobe in [1, 2, 4, 8, 16, 32, 64]:
+        if nprobe > ivf.nlist:
+            break
+        ivf.nprobe = nprobe
+        start = time.perf_counter()
+        for query in queries:
+            ivf.search(query[None, :], k)
+        ivf_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = measure_recall(ivf, exact, queries, k)
+        print(f"  nprobe={nprobe:<7} {ivf_ms:7.2f} ms/query  recall {recall:.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of the KB")
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = 4 * sqrt(N))")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    benchmark(args.synthetic, args.dims, args.nlist, args.k, args.queries)
@@ -0,0 +1,125 @@
+"""
+In-memory BM25 inverted index over KB articles, and reciprocal rank fusion
+for hybrid (vector + lexical) ranking.
+
+Tokens keep digits and underscores, so error codes like "0x80070005" or
+"e13" are matched exactly, which embeddings tend to blur.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Container, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "how",
+    "i", "in", "is", "it", "my", "of", "on", "or", "the", "to", "was", "what", "with"
+}
+
+# Title and keyword matches count more than body matches
+FIELD_WEIGHTS = {"title": 2, "content": 1, "keywords": 2}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens without stopwords"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+def article_tokens(article: Dict) -> List[str]:
+    """Field-weighted tokens of a KB article (title, content, keywords)"""
+    tokens = []
+    for field, weight in FIELD_WEIGHTS.items():
+        value = article.get(field) or ""
+        if not isinstance(value, str):
+            value = " ".join(value)
+        tokens.extend(tokenize(value) * weight)
+    return tokens
+
+class BM25Index:
+    """
+    BM25 (Okapi) over integer document keys. Documents can be added,
+    replaced and removed one at a time, so the index follows incremental
+    KB refreshes without a rebuild.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, key: int, tokens: Iterable[str]):
+        """Index a document (replacing any previous version with the same key)"""
+        self.remove(key)
+        terms = Counter(tokens)
+        self._doc_terms[key] = terms
+        self._doc_lengths[key] = sum(terms.values())
+        self._total_length += self._doc_lengths[key]
+        for term, count in terms.items():
+            self._postings[term][key] = count
+
+    def remove(self, key: int):
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(key)
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, limit: int, allowed: Optional[Container[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Top `limit` (key, score) pairs, best first; documents with no query
+        term, or not in `allowed` when given, are skipped
+        """
+        n = len(self._doc_terms)
+        if n == 0 or limit <= 0:
+            return []
+
+        avg_length = self._total_length / n
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                if allowed is not None and key not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[key] / avg_length)
+                scores[key] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    @classmethod
+    def from_articles(cls, articles: Sequence[Optional[Dict]]) -> "BM25Index":
+        """Index articles keyed by their position (None entries are skipped)"""
+        index = cls()
+        for key, article in enumerate(articles):
+            if article is not None:
+                index.add(key, article_tokens(article))
+        return index
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Tuple[Hashable, float]]],
+    limit: int,
+    k: int = 60
+) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse several best-first rankings of (key, score) into one:
+    score(key) = sum over rankings of 1 / (k + rank). Raw scores are ignored,
+    so cosine and BM25 scales don't need to be calibrated against each other.
+    """
+    fused: Dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, (key, _) in enumerate(ranking, 1):
+            fused[key] += 1.0 / (k + rank)
+    return heapq.nlargest(limit, fused.items(), key=lambda item: item[1])
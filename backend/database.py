@@ -2,23 +2,25 @@
 Database connection and session management
 """
 
-import os
 from contextlib import contextmanager
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool
 from typing import Generator
 
-DATABASE_URL = "postgresql://vmeenakshisundaram@localhost:5432/powergrid_tickets"
+from config import settings
 
-# Connection pool for better performance
+DATABASE_URL = settings.DATABASE_URL
+
+# Connection pool for better performance. Thread-safe: search, refresh and
+# classifier code use it from worker threads (endpoints use async_database.py)
 connection_pool = None
 
 def init_db_pool(minconn=1, maxconn=10):
     """Initialize database connection pool"""
     global connection_pool
     if connection_pool is None:
-        connection_pool = SimpleConnectionPool(minconn, maxconn, DATABASE_URL)
+        connection_pool = ThreadedConnectionPool(minconn, maxconn, DATABASE_URL)
     return connection_pool
 
 def get_db_pool():
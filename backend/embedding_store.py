@@ -0,0 +1,238 @@
+"""
+On-disk store of KB embeddings that search workers memory-map.
+
+Layout of EMBEDDING_STORE_PATH:
+
+    vectors-000001.f32    raw, L2-normalized float32 rows (append-only)
+    manifest-000003.json  version, dims, data file, row count and article metadata
+    CURRENT               name of the live manifest, switched with os.replace
+
+Readers map only the first `count` rows of the data file named by the current
+manifest, so bytes appended by a writer are invisible until the new manifest
+is published. All workers map the same file and share its pages through the
+OS page cache; loading needs no database round trip.
+
+Sync from the database:
+
+    python embedding_store.py sync
+    python embedding_store.py info
+"""
+
+import argparse
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+
+# Article fields kept in the manifest (everything search results need)
+ARTICLE_FIELDS = ("id", "title", "content", "category", "keywords", "updated_at")
+
+# Fields whose change makes a stored article stale (updated_at is not a
+# reliable signal: older schemas bump it on every view count update)
+CONTENT_FIELDS = ("title", "content", "category", "keywords")
+
+def _article_changed(article: Dict, vector: np.ndarray, stored_article: Dict, stored_vector: np.ndarray) -> bool:
+    """Whether the article's content or (normalized) embedding differs from the stored row"""
+    if any(article.get(field) != stored_article.get(field) for field in CONTENT_FIELDS):
+        return True
+    norm = np.linalg.norm(vector)
+    return not np.allclose(vector / (norm or 1.0), stored_vector, atol=1e-6)
+
+def _write_atomic(path: str, data: bytes):
+    """Write a file via a temporary name + fsync + os.replace"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class EmbeddingStore:
+    """Versioned, append-only float32 embedding file plus article manifest"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._file(CURRENT_FILE))
+
+    def manifest(self) -> Optional[Dict]:
+        """The live manifest, or None if the store is empty"""
+        if not self.exists():
+            return None
+        with open(self._file(CURRENT_FILE)) as f:
+            manifest_name = f.read().strip()
+        with open(self._file(manifest_name)) as f:
+            return json.load(f)
+
+    def load(self) -> Tuple[np.ndarray, List[Dict]]:
+        """Read-only memory map of the live rows and their articles (same order)"""
+        manifest = self.manifest()
+        if manifest is None:
+            raise FileNotFoundError(f"No embedding store at {self.path}")
+
+        count, dims = manifest["count"], manifest["dims"]
+        if count == 0:
+            return np.zeros((0, dims), dtype=np.float32), []
+        matrix = np.memmap(
+            self._file(manifest["data_file"]), dtype=np.float32, mode="r", shape=(count, dims)
+        )
+        return matrix, manifest["articles"]
+
+    def _publish(self, version: int, dims: int, data_file: str, articles: List[Dict]):
+        """Write the manifest for `version` and switch CURRENT to it"""
+        manifest_name = f"manifest-{version:06d}.json"
+        manifest = {
+            "version": version,
+            "dims": dims,
+            "data_file": data_file,
+            "count": len(articles),
+            "articles": articles
+        }
+        _write_atomic(self._file(manifest_name), json.dumps(manifest, default=str).encode())
+        _write_atomic(self._file(CURRENT_FILE), manifest_name.encode())
+        self._remove_stale(keep={manifest_name, data_file})
+        logger.info(f"Embedding store version {version}: {len(articles)} articles")
+
+    def _remove_stale(self, keep: set):
+        """Delete old manifests/data files (readers that mapped them keep their pages)"""
+        for name in os.listdir(self.path):
+            if name.startswith(("manifest-", "vectors-")) and name not in keep:
+                try:
+                    os.remove(self._file(name))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _prepare(articles: List[Dict], vectors: np.ndarray, dims: int = -1) -> Tuple[List[Dict], np.ndarray]:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(articles), dims)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        articles = [{field: article.get(field) for field in ARTICLE_FIELDS} for article in articles]
+        return articles, vectors / norms
+
+    def write(self, articles: List[Dict], vectors: np.ndarray):
+        """Replace the store contents with a new data file (full build / compaction)"""
+        os.makedirs(self.path, exist_ok=True)
+        current = self.manifest()
+        # Group rows by category so the search engine's per-category
+        # sub-indexes can be zero-copy slices of the memory map
+        order = sorted(range(len(articles)), key=lambda i: articles[i].get("category") or "other")
+        articles = [articles[i] for i in order]
+        vectors = np.asarray(vectors, dtype=np.float32)[order] if len(order) else vectors
+        articles, vectors = self._prepare(articles, vectors, current["dims"] if current and not articles else -1)
+        version = current["version"] + 1 if current else 1
+
+        data_file = f"vectors-{version:06d}.f32"
+        _write_atomic(self._file(data_file), vectors.tobytes())
+        self._publish(version, vectors.shape[1], data_file, articles)
+
+    def append(self, articles: List[Dict], vectors: np.ndarray):
+        """
+        Append new articles to the live data file and publish a new version.
+        Rows must stay grouped by category, so articles that would land
+        outside their category's group trigger a rewrite instead.
+        """
+        current = self.manifest()
+        if current is None:
+            self.write(articles, vectors)
+            return
+        if not articles:
+            return
+
+        articles, vectors = self._prepare(articles, vectors)
+        if vectors.shape[1] != current["dims"]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} != store dimension {current['dims']}")
+
+        categories = [article.get("category") or "other" for article in current["articles"] + articles]
+        if categories != sorted(categories):
+            matrix, stored = self.load()
+            self.write(stored + articles, np.concatenate([np.asarray(matrix), vectors]))
+            return
+
+        data_path = self._file(current["data_file"])
+        with open(data_path, "r+b") as f:
+            # Drop bytes left by an append that never got published
+            f.truncate(current["count"] * current["dims"] * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._publish(current["version"] + 1, current["dims"], current["data_file"], current["articles"] + articles)
+
+    def sync_from_database(self) -> Dict[str, int]:
+        """
+        Bring the store in line with the knowledge_base table: new articles are
+        appended (or rewritten in when their category group is not the last);
+        articles whose content or embedding changed, or that were deleted,
+        trigger a rewrite (compaction)
+        """
+        from models import KnowledgeBaseModel
+        from semantic_search import to_vector
+
+        rows, vectors = [], []
+        for row in KnowledgeBaseModel.get_all_with_embeddings():
+            vector = to_vector(row.pop("embedding", None))
+            if vector is not None:
+                rows.append(row)
+                vectors.append(vector)
+
+        current = self.manifest()
+        if current is None and not rows:
+            return {"mode": "empty", "articles": 0, "new": 0, "changed": 0, "deleted": 0}
+        matrix, stored_articles = self.load() if current else (None, [])
+        stored = {article["id"]: row for row, article in enumerate(stored_articles)}
+        new_ids = {str(row["id"]) for row in rows} - set(stored)
+        changed = [
+            row for row, vector in zip(rows, vectors)
+            if str(row["id"]) in stored and _article_changed(
+                row, vector, stored_articles[stored[str(row["id"])]], matrix[stored[str(row["id"])]]
+            )
+        ]
+        deleted = len(stored) - (len(rows) - len(new_ids))
+
+        if current is None or changed or deleted:
+            self.write(rows, np.asarray(vectors, dtype=np.float32))
+            mode = "rewrite"
+        else:
+            new_rows = [i for i, row in enumerate(rows) if str(row["id"]) in new_ids]
+            self.append([rows[i] for i in new_rows], np.asarray([vectors[i] for i in new_rows], dtype=np.float32))
+            mode = "append"
+
+        return {"mode": mode, "articles": len(rows), "new": len(new_ids), "changed": len(changed), "deleted": deleted}
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """Embedding store at EMBEDDING_STORE_PATH, or None when not configured"""
+    return EmbeddingStore(settings.EMBEDDING_STORE_PATH) if settings.EMBEDDING_STORE_PATH else None
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Manage the on-disk KB embedding store")
+    parser.add_argument("command", choices=["sync", "info"])
+    parser.add_argument("--path", default=settings.EMBEDDING_STORE_PATH, help="Store directory")
+    args = parser.parse_args()
+
+    if not args.path:
+        parser.error("set EMBEDDING_STORE_PATH or pass --path")
+    store = EmbeddingStore(args.path)
+
+    if args.command == "sync":
+        print(store.sync_from_database())
+    else:
+        manifest = store.manifest()
+        if manifest is None:
+            print(f"No embedding store at {args.path}")
+        else:
+            print(f"Version {manifest['version']}: {manifest['count']} articles x {manifest['dims']} dims ({manifest['data_file']})")
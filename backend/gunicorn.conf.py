@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration for multi-worker deployments.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+With SHARE_MODEL_WEIGHTS=true the models are loaded once in the gunicorn
+master before the workers are forked, so all workers share the read-only
+weight pages copy-on-write instead of each loading its own copy.
+"""
+
+import os
+
+from config import settings
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Import the app in the master so the workers inherit it
+preload_app = True
+
+def when_ready(server):
+    """Runs in the master after the app is imported, before workers are forked"""
+    if settings.SHARE_MODEL_WEIGHTS:
+        from inference_pool import preload_shared_models
+        server.log.info("Preloading models in the master for copy-on-write sharing...")
+        preload_shared_models()
+
+def post_fork(server, worker):
+    """Give each worker its share of the CPU cores for intra-op parallelism"""
+    if settings.INFERENCE_THREADS_PER_WORKER > 0:
+        import torch
+        torch.set_num_threads(settings.INFERENCE_THREADS_PER_WORKER)
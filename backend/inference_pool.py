@@ -0,0 +1,280 @@
+"""
+Inference worker pool that keeps model execution off the FastAPI event loop
+"""
+
+import asyncio
+import gc
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Worker-side functions. These run inside the inference processes, which own
+# their own TicketClassifier / SemanticSearchEngine instances.
+# ---------------------------------------------------------------------------
+
+# Shared [incremental, full] counters bumped by InferencePool.refresh_kb, and
+# the values this worker has already acted on
+_kb_refresh_requests = None
+_kb_refresh_seen = [0, 0]
+
+def _init_worker(kb_refresh_requests=None):
+    """Set up an inference process and (unless lazy) warm its models up"""
+    global _kb_refresh_requests
+    import torch
+    from model_registry import get_model_registry
+    from semantic_search import start_kb_auto_refresh
+
+    if settings.INFERENCE_THREADS_PER_WORKER > 0:
+        torch.set_num_threads(settings.INFERENCE_THREADS_PER_WORKER)
+
+    _kb_refresh_requests = kb_refresh_requests
+    if kb_refresh_requests is not None:
+        _kb_refresh_seen[:] = kb_refresh_requests[:]
+
+    _load_models()
+    get_model_registry().start_idle_reaper()
+    start_kb_auto_refresh()
+    logger.info(f"Inference worker {os.getpid()} ready")
+
+def _ping() -> int:
+    """No-op task used to force worker start-up"""
+    return os.getpid()
+
+def _classify_batch(texts: List[str]) -> List[Dict]:
+    from ai_classifier import get_classifier
+    return get_classifier().classify_batch(texts)
+
+def _refresh_kb(full: bool = False) -> Dict:
+    from model_registry import get_model_registry
+    from semantic_search import get_search_engine
+
+    if not get_model_registry().is_loaded("search_engine"):
+        # Nothing cached; the engine reads the whole table when it loads
+        return {"loaded": False}
+    engine = get_search_engine()
+    if full:
+        engine.refresh_cache()
+        return {"loaded": True, "full": True}
+    return {"loaded": True, **engine.refresh_incremental()}
+
+def _apply_kb_refresh_requests():
+    """Run the KB refreshes requested since this worker last checked"""
+    if _kb_refresh_requests is None:
+        return
+    requested = _kb_refresh_requests[:]
+    if requested == _kb_refresh_seen:
+        return
+    full = requested[1] != _kb_refresh_seen[1]
+    _kb_refresh_seen[:] = requested
+    try:
+        _refresh_kb(full)
+    except Exception as e:
+        logger.warning(f"Requested KB refresh failed: {e}")
+
+def _search(
+    query: str,
+    limit: int,
+    mode: str = "semantic",
+    category: Optional[str] = None,
+    fields: str = "full"
+) -> List[Dict]:
+    from semantic_search import get_search_engine
+    _apply_kb_refresh_requests()
+    return get_search_engine().search(query, limit, mode, category, fields)
+
+def _search_batch(queries: List[str], limit: int, fields: str = "full") -> List[List[Dict]]:
+    from semantic_search import get_search_engine
+    _apply_kb_refresh_requests()
+    return get_search_engine().search_batch(queries, limit, fields)
+
+def _load_models():
+    """Register the models in this process and, unless lazy, load and warm them up"""
+    import ai_classifier  # noqa: F401 (registers "classifier")
+    import semantic_search  # noqa: F401 (registers "search_engine")
+    from model_registry import get_model_registry
+
+    if settings.MODEL_WARMUP != "lazy":
+        logger.info(f"Process {os.getpid()} warming up models...")
+        get_model_registry().warm_up()
+
+def preload_shared_models():
+    """
+    Load all models in the current (parent) process so that forked children
+    share the weight pages copy-on-write instead of each loading a copy.
+
+    No inference is run here: torch/OpenMP thread pools started before fork()
+    can deadlock in the children, which run their own warm-up after forking.
+    """
+    import ai_classifier  # noqa: F401 (registers "classifier")
+    import semantic_search  # noqa: F401 (registers "search_engine")
+    from model_registry import get_model_registry
+
+    registry = get_model_registry()
+    for name in registry.status():
+        registry.get(name)
+
+    # Move everything loaded so far into the permanent GC generation, so the
+    # collector never touches (and thereby copies) those pages in the children
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Models preloaded in parent process {os.getpid()} for copy-on-write sharing")
+
+class InferencePool:
+    """
+    Awaitable front-end for model inference.
+
+    With `workers > 0` requests are sent over IPC to a pool of inference
+    processes, each holding its own copy of the models. With `workers == 0`
+    models are loaded in the API process and run on the default thread pool,
+    which still keeps the event loop responsive.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = max(0, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._kb_refresh_requests = None
+
+        # "pending" -> "running" -> "done" / "failed"
+        self.warmup_state = "pending"
+        self.warmup_error: Optional[str] = None
+
+        # Which model decided each category, tallied from classification results
+        self.category_model_counts: Dict[str, int] = {"prototype": 0, "zero_shot": 0}
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.workers > 0
+
+    def start(self):
+        """Create the process pool (no-op in in-process mode)"""
+        if self.uses_processes and self._executor is None:
+            if settings.SHARE_MODEL_WEIGHTS and settings.INFERENCE_START_METHOD == "fork":
+                # Workers are forked lazily from this process and inherit the weights
+                preload_shared_models()
+            logger.info(f"Starting {self.workers} inference worker processes...")
+            context = multiprocessing.get_context(settings.INFERENCE_START_METHOD)
+            self._kb_refresh_requests = context.Array('l', 2)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._kb_refresh_requests,)
+            )
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        if self.uses_processes:
+            self.start()
+            return await loop.run_in_executor(self._executor, func, *args)
+        return await loop.run_in_executor(None, func, *args)
+
+    async def warmup(self):
+        """Load models and run a dummy inference ahead of the first request"""
+        self.warmup_state = "running"
+        try:
+            if self.uses_processes:
+                # One ping per worker spawns every process and runs its initializer
+                pids = await asyncio.gather(*(self._run(_ping) for _ in range(self.workers)))
+                logger.info(f"Inference workers started: {sorted(set(pids))}")
+            else:
+                await self._run(_load_models)
+            self.warmup_state = "done"
+        except Exception as e:
+            logger.error(f"Model warm-up failed: {e}")
+            self.warmup_state = "failed"
+            self.warmup_error = str(e)
+
+    @property
+    def ready(self) -> bool:
+        """True once models are warm (always true in lazy mode)"""
+        return settings.MODEL_WARMUP == "lazy" or self.warmup_state == "done"
+
+    def get_status(self) -> Dict:
+        """Readiness details for the /ready endpoint"""
+        status = {
+            "ready": self.ready,
+            "warmup": settings.MODEL_WARMUP,
+            "warmup_state": self.warmup_state,
+            "workers": self.workers
+        }
+        if self.warmup_error:
+            status["error"] = self.warmup_error
+        if not self.uses_processes:
+            from model_registry import get_model_registry
+            status["models"] = get_model_registry().status()
+        return status
+
+    async def classify_batch(self, texts: List[str]) -> List[Dict]:
+        """Classify a list of texts; results are in input order"""
+        results = await self._run(_classify_batch, texts)
+        for result in results:
+            model_used = result.get("category_model")
+            if model_used in self.category_model_counts:
+                self.category_model_counts[model_used] += 1
+        return results
+
+    def get_classifier_stats(self) -> Dict:
+        """Classification counters, including the cascade escalation rate"""
+        total = sum(self.category_model_counts.values())
+        escalated = self.category_model_counts["zero_shot"]
+        return {
+            "mode": settings.CLASSIFIER_MODE,
+            "total": total,
+            "resolved_by_prototype": self.category_model_counts["prototype"],
+            "escalated_to_zero_shot": escalated,
+            "escalation_rate": round(escalated / total, 4) if total else 0.0
+        }
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 3,
+        mode: str = "semantic",
+        category: Optional[str] = None,
+        fields: str = "full"
+    ) -> List[Dict]:
+        """
+        KB search in the given mode (semantic, lexical (BM25) or hybrid),
+        optionally within a category; fields="snippet" omits full content
+        """
+        return await self._run(_search, query, limit, mode, category, fields)
+
+    async def search_batch(self, queries: List[str], limit: int = 3, fields: str = "full") -> List[List[Dict]]:
+        """Semantic KB search for many queries; results are in query order"""
+        return await self._run(_search_batch, queries, limit, fields)
+
+    async def refresh_kb(self, full: bool = False) -> Dict:
+        """
+        Refresh the KB embedding cache (only changed articles unless `full`).
+        Worker processes can't be addressed individually, so they are flagged
+        and each one refreshes before its next search.
+        """
+        if self.uses_processes:
+            self.start()
+            with self._kb_refresh_requests.get_lock():
+                self._kb_refresh_requests[1 if full else 0] += 1
+            return {"scheduled": True, "full": full, "workers": self.workers}
+        return await self._run(_refresh_kb, full)
+
+    def shutdown(self):
+        """Stop worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+# Global inference pool instance
+_inference_pool = None
+
+def get_inference_pool() -> InferencePool:
+    """Get or create inference pool instance (singleton pattern)"""
+    global _inference_pool
+    if _inference_pool is None:
+        _inference_pool = InferencePool(settings.INFERENCE_WORKERS)
+    return _inference_pool
@@ -0,0 +1,144 @@
+"""
+Compiled multi-pattern keyword matching (Aho-Corasick).
+
+All keyword tables (classifier priority / auto-resolve, automation rules and
+intent patterns) are registered as named rules in one shared automaton, so a
+message is lowercased and scanned once and every rule hit comes out of a
+single pass. Cost is linear in the text length regardless of how many
+keywords are registered.
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Recently scanned texts kept so the classifier, automation engine and intent
+# detector can all reuse the scan of the same message
+SCAN_CACHE_SIZE = 256
+
+def _is_word_char(char: str) -> bool:
+    """Same notion of a word character as regex \\w"""
+    return char.isalnum() or char == "_"
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over named keyword rules.
+
+    `add_rule(name, keywords)` registers (or replaces) a rule; `scan(text)`
+    returns {rule_name: frozenset(matched keywords)} for every rule with at
+    least one hit. Matching is case-insensitive substring matching, like
+    `keyword in text.lower()`; rules added with `whole_word=True` only match
+    on word boundaries, like `re.search(r"\\b(...)\\b", text)`.
+    """
+
+    def __init__(self):
+        self._rules: Dict[str, Tuple[Tuple[str, ...], bool]] = {}
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Dict[str, FrozenSet[str]]]" = OrderedDict()
+
+        # Automaton state, rebuilt lazily after rule changes
+        self._goto: List[Dict[str, int]] = []
+        self._fail: List[int] = []
+        self._output: List[List[Tuple[str, str, bool]]] = []
+        self._built = False
+        self._version = 0
+
+    def add_rule(self, name: str, keywords: Iterable[str], whole_word: bool = False):
+        """Register a named rule; an existing rule with the same name is replaced"""
+        keywords = tuple(keyword.lower() for keyword in keywords if keyword)
+        with self._lock:
+            if self._rules.get(name) == (keywords, whole_word):
+                return
+            self._rules[name] = (keywords, whole_word)
+            self._built = False
+            self._version += 1
+            self._cache.clear()
+
+    def _build(self):
+        """Compile all rules into the goto/fail/output tables"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[Tuple[str, str, bool]]] = [[]]
+
+        for name, (keywords, whole_word) in self._rules.items():
+            for keyword in keywords:
+                state = 0
+                for char in keyword:
+                    next_state = goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(goto)
+                        goto[state][char] = next_state
+                        goto.append({})
+                        output.append([])
+                    state = next_state
+                output[state].append((name, keyword, whole_word))
+
+        # Breadth-first construction of failure links
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._goto, self._fail, self._output = goto, fail, output
+        self._built = True
+        logger.info(
+            f"Keyword matcher compiled: {len(self._rules)} rules, "
+            f"{sum(len(k) for k, _ in self._rules.values())} keywords, {len(goto)} states"
+        )
+
+    def scan(self, text: str) -> Dict[str, FrozenSet[str]]:
+        """Return every rule hit in `text` as {rule_name: frozenset(keywords)}"""
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+            if not self._built:
+                self._build()
+            goto, fail, output = self._goto, self._fail, self._output
+            version = self._version
+
+        text_lower = text.lower()
+        hits: Dict[str, set] = {}
+        state = 0
+        for end, char in enumerate(text_lower):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for name, keyword, whole_word in output[state]:
+                if whole_word:
+                    start = end - len(keyword) + 1
+                    if start > 0 and _is_word_char(text_lower[start - 1]):
+                        continue
+                    if end + 1 < len(text_lower) and _is_word_char(text_lower[end + 1]):
+                        continue
+                hits.setdefault(name, set()).add(keyword)
+
+        result = {name: frozenset(keywords) for name, keywords in hits.items()}
+        with self._lock:
+            # Don't cache a scan made with rules that changed meanwhile
+            if version == self._version:
+                self._cache[text] = result
+                if len(self._cache) > SCAN_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return result
+
+# Global keyword matcher instance
+_keyword_matcher = None
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """Get or create the shared keyword matcher (singleton pattern)"""
+    global _keyword_matcher
+    if _keyword_matcher is None:
+        _keyword_matcher = KeywordMatcher()
+    return _keyword_matcher
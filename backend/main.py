@@ -4,23 +4,28 @@ FastAPI backend for POWERGRID AI Ticketing System
 
 from fastapi import FastAPI, HTTPException, Depends, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 from datetime import datetime
 from uuid import UUID
 import os
+import asyncio
 from contextlib import asynccontextmanager
 import logging
 
-from database import init_db_pool, get_db_pool, get_db_cursor
-from models import TicketModel, KnowledgeBaseModel
-from ai_classifier import get_classifier
-from semantic_search import get_search_engine
+from database import init_db_pool, get_db_pool
+from async_database import UnitOfWork, init_async_pool, close_async_pool, get_async_connection, get_unit_of_work
+from async_models import AsyncTicketModel, AsyncKnowledgeBaseModel
+from batching import get_classify_batcher
+from inference_pool import get_inference_pool
+from model_registry import get_model_registry
 from notifications import get_notification_service
 from config import settings
 from automation import get_automation_engine
 from intent_classifier import AdvancedIntentClassifier
 from conversation_manager import ConversationManager
+from text_budget import select_fields
 
 # Configure logging
 logging.basicConfig(
@@ -33,19 +38,42 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    logger.info("Initializing database connection pool...")
+    logger.info("Initializing database connection pools...")
+    # Endpoints query through the async pool; the sync pool serves the search
+    # engine and classifier, which run on threads
+    await init_async_pool()
     init_db_pool()
-    logger.info("Database pool initialized!")
+    logger.info("Database pools initialized!")
     
-    logger.info("Loading AI models...")
-    get_classifier()
-    get_search_engine()
-    logger.info("AI models loaded!")
+    inference_pool = get_inference_pool()
+    inference_pool.start()
+    warmup_task = None
+    if settings.MODEL_WARMUP == "eager":
+        logger.info("Loading AI models...")
+        await inference_pool.warmup()
+        logger.info("AI models loaded!")
+    elif settings.MODEL_WARMUP == "background":
+        # Serve immediately; /ready reports when models are warm
+        logger.info("Warming up AI models in the background...")
+        warmup_task = asyncio.create_task(inference_pool.warmup())
+    
+    if not inference_pool.uses_processes:
+        # Inference workers run their own reaper and KB refresh poller
+        from semantic_search import start_kb_auto_refresh
+        get_model_registry().start_idle_reaper()
+        start_kb_auto_refresh()
     
     yield
     
     # Shutdown
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if settings.MICROBATCH_ENABLED:
+        await get_classify_batcher().close()
+    inference_pool.shutdown()
+    
     logger.info("Closing database connections...")
+    await close_async_pool()
     pool = get_db_pool()
     if pool:
         pool.closeall()
@@ -102,10 +130,19 @@ class ClassificationResponse(BaseModel):
     auto_resolve: bool = False
     resolution_message: Optional[str] = None
 
+class BatchClassificationRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=settings.CLASSIFY_BATCH_MAX_TEXTS)
+
+class BatchKBSearchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=settings.KB_SEARCH_BATCH_MAX_QUERIES)
+    limit: int = Field(3, ge=1, le=10)
+    fields: str = Field("full", pattern="^(full|snippet)$")
+
 class KBArticle(BaseModel):
     id: UUID
     title: str
-    content: str
+    content: Optional[str] = None
+    snippet: Optional[str] = None
     category: str
     views: Optional[int] = 0
     helpful_count: Optional[int] = 0
@@ -145,14 +182,23 @@ async def root():
         "endpoints": {
             "tickets": "/tickets",
             "classify": "/classify",
+            "classify_batch": "/classify/batch",
             "kb_search": "/kb/search",
+            "kb_search_batch": "/kb/search/batch",
+            "kb_refresh": "/kb/refresh",
             "chatbot": "/chatbot",
+            "metrics": "/metrics",
+            "ready": "/ready",
             "docs": "/docs"
         }
     }
 
 @app.post("/tickets", response_model=TicketResponse, status_code=201)
-async def create_ticket(ticket: TicketCreate, background_tasks: BackgroundTasks):
+async def create_ticket(
+    ticket: TicketCreate,
+    background_tasks: BackgroundTasks,
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
     """
     Create a new ticket from chatbot, email, or other sources.
     If priority/category not provided, they will be classified automatically.
@@ -166,14 +212,15 @@ async def create_ticket(ticket: TicketCreate, background_tasks: BackgroundTasks)
         assigned_team = TEAM_MAPPING.get(category, "General IT Support")
         
         # Create ticket in database
-        new_ticket = TicketModel.create(
+        new_ticket = await AsyncTicketModel.create(
             source=ticket.source,
             employee=ticket.employee,
             subject=ticket.subject,
             description=ticket.description,
             priority=priority,
             category=category,
-            assigned_team=assigned_team
+            assigned_team=assigned_team,
+            uow=uow
         )
         
         notification_service = get_notification_service()
@@ -199,7 +246,7 @@ async def create_ticket(ticket: TicketCreate, background_tasks: BackgroundTasks)
 @app.get("/tickets/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(ticket_id: UUID):
     """Get ticket details by ID"""
-    ticket = TicketModel.get_by_id(ticket_id)
+    ticket = await AsyncTicketModel.get_by_id(ticket_id)
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
@@ -218,7 +265,7 @@ async def list_tickets(
     Returns tickets sorted by creation date (newest first).
     """
     try:
-        tickets = TicketModel.list_tickets(
+        tickets = await AsyncTicketModel.list_tickets(
             employee=employee,
             status=status,
             category=category,
@@ -234,19 +281,17 @@ async def list_tickets(
 async def update_ticket_status(
     ticket_id: UUID,
     status_update: TicketStatusUpdate,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """Update ticket status"""
     try:
-        # Get current ticket
-        current_ticket = TicketModel.get_by_id(ticket_id)
-        if not current_ticket:
+        # One statement updates the ticket and returns its previous status
+        updated_ticket = await AsyncTicketModel.transition_status(ticket_id, status_update.status, uow=uow)
+        if not updated_ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
         
-        old_status = current_ticket['status']
-        
-        # Update ticket
-        updated_ticket = TicketModel.update_status(ticket_id, status_update.status)
+        old_status = updated_ticket.pop('old_status')
         
         notification_service = get_notification_service()
         background_tasks.add_task(
@@ -273,8 +318,12 @@ async def classify_ticket(request: ClassificationRequest):
     Also checks for auto-resolvable issues.
     """
     try:
-        classifier = get_classifier()
-        result = classifier.classify(request.text)
+        if settings.MICROBATCH_ENABLED:
+            # Concurrent requests share one batched forward pass
+            result = await get_classify_batcher().submit(request.text)
+        else:
+            results = await get_inference_pool().classify_batch([request.text])
+            result = results[0]
         
         logger.info(f"Classification result: {result}")
         
@@ -290,23 +339,71 @@ async def classify_ticket(request: ClassificationRequest):
         logger.error(f"Classification error: {e}")
         raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
 
+@app.post("/classify/batch", response_model=List[ClassificationResponse])
+async def classify_tickets_batch(request: BatchClassificationRequest):
+    """
+    Classify many ticket texts in one call (used for email/GLPI/SolMan backfills).
+    Results are returned in the same order as the input texts.
+    """
+    if any(not text.strip() for text in request.texts):
+        raise HTTPException(status_code=422, detail="Texts must not be empty")
+    
+    try:
+        results = await get_inference_pool().classify_batch(request.texts)
+        
+        logger.info(f"Batch classified {len(results)} texts")
+        
+        return [
+            {
+                "category": result["category"],
+                "priority": result["priority"],
+                "confidence": result["confidence"],
+                "auto_resolve": result["auto_resolve"],
+                "resolution_message": result["resolution_message"]
+            }
+            for result in results
+        ]
+    
+    except Exception as e:
+        logger.error(f"Batch classification error: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch classification failed: {str(e)}")
+
 @app.get("/kb/search", response_model=List[KBArticle])
 async def search_knowledge_base(
     query: str = Query(..., min_length=1, description="Search query"),
     limit: int = Query(3, ge=1, le=10, description="Number of results to return"),
-    use_semantic: bool = Query(True, description="Use semantic search (AI-powered)")
+    use_semantic: bool = Query(True, description="Use semantic search (AI-powered)"),
+    mode: Optional[str] = Query(
+        None,
+        pattern="^(semantic|lexical|hybrid|keyword)$",
+        description="semantic, lexical (BM25), hybrid (both, rank-fused) or keyword (SQL match); overrides use_semantic"
+    ),
+    category: Optional[str] = Query(
+        None,
+        pattern="^(network|access|hardware|software|other)$",
+        description="Only return articles from this category"
+    ),
+    fields: str = Query(
+        "full",
+        pattern="^(full|snippet)$",
+        description="full returns each article's content, snippet only its best-matching excerpt"
+    ),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """
-    Search knowledge base using semantic similarity (AI-powered) or keyword matching.
-    Semantic search provides better results by understanding context and meaning.
+    Search knowledge base using semantic similarity (AI-powered), BM25 lexical
+    ranking, or a hybrid of both. Semantic search understands context and
+    meaning; lexical search matches exact terms such as error codes.
     """
+    # use_semantic=false keeps its original meaning: SQL keyword match over every article
+    mode = mode or ("semantic" if use_semantic else "keyword")
     try:
-        if use_semantic:
-            search_engine = get_search_engine()
-            articles = search_engine.search(query, limit)
+        if mode == "keyword":
+            articles = select_fields(
+                await AsyncKnowledgeBaseModel.search_by_keywords(query, limit, category, uow=uow), fields, settings.SNIPPET_MAX_CHARS
+            )
         else:
-            # Fallback to keyword search
-            articles = KnowledgeBaseModel.search_by_keywords(query, limit)
+            articles = await get_inference_pool().search(query, limit, mode, category, fields)
         
         logger.info(f"Found {len(articles)} articles for query: {query}")
         return articles
@@ -315,17 +412,48 @@ async def search_knowledge_base(
         logger.error(f"Search error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to search knowledge base: {str(e)}")
 
+@app.post("/kb/search/batch", response_model=List[List[KBArticle]])
+async def search_knowledge_base_batch(request: BatchKBSearchRequest):
+    """
+    Semantic KB search for many queries in one call (chatbot front-ends, triage jobs).
+    Returns one list of articles with relevance scores per query, in input order.
+    """
+    if any(not query.strip() for query in request.queries):
+        raise HTTPException(status_code=422, detail="Queries must not be empty")
+    
+    try:
+        results = await get_inference_pool().search_batch(request.queries, request.limit, request.fields)
+        
+        logger.info(f"Batch searched {len(request.queries)} queries")
+        return results
+    
+    except Exception as e:
+        logger.error(f"Batch search error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to search knowledge base: {str(e)}")
+
+@app.post("/kb/refresh")
+async def refresh_knowledge_base(
+    full: bool = Query(False, description="Reload every article instead of only changed ones")
+):
+    """Pick up KB articles added, edited or deleted since the last refresh"""
+    try:
+        return await get_inference_pool().refresh_kb(full)
+    
+    except Exception as e:
+        logger.error(f"KB refresh error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to refresh knowledge base: {str(e)}")
+
 @app.get("/kb/{article_id}", response_model=KBArticle)
-async def get_kb_article(article_id: UUID):
+async def get_kb_article(article_id: UUID, uow: UnitOfWork = Depends(get_unit_of_work)):
     """Get knowledge base article by ID and increment view count"""
     try:
-        article = KnowledgeBaseModel.get_by_id(article_id)
+        article = await AsyncKnowledgeBaseModel.get_by_id(article_id, uow=uow)
         
         if not article:
             raise HTTPException(status_code=404, detail="Article not found")
         
         # Increment view count
-        KnowledgeBaseModel.increment_views(article_id)
+        await AsyncKnowledgeBaseModel.increment_views(article_id, uow=uow)
         
         return article
     
@@ -336,7 +464,11 @@ async def get_kb_article(article_id: UUID):
         raise HTTPException(status_code=500, detail=f"Failed to fetch article: {str(e)}")
 
 @app.post("/chatbot", response_model=ChatbotResponse)
-async def chatbot_interaction(request: ChatbotRequest, background_tasks: BackgroundTasks):
+async def chatbot_interaction(
+    request: ChatbotRequest,
+    background_tasks: BackgroundTasks,
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
     """
     Enhanced chatbot with context awareness and better intent detection
     """
@@ -369,7 +501,16 @@ async def chatbot_interaction(request: ChatbotRequest, background_tasks: Backgro
         
         # For IT-related queries, proceed with enhanced logic
         classification = await classify_ticket(ClassificationRequest(text=request.message))
-        kb_articles = await search_knowledge_base(query=request.message, limit=3)
+        # Search only the predicted category's articles; "other" spans everything.
+        # Suggestions carry snippets, not whole articles (GET /kb/{id} has those)
+        category = classification['category'] if classification['category'] != "other" else None
+        kb_articles = await search_knowledge_base(
+            query=request.message, limit=3, use_semantic=True, mode=None, category=category, fields="snippet", uow=uow
+        )
+        if not kb_articles and category:
+            kb_articles = await search_knowledge_base(
+                query=request.message, limit=3, use_semantic=True, mode=None, category=None, fields="snippet", uow=uow
+            )
         
         # Enhanced auto-resolution with follow-up questions
         if classification['auto_resolve']:
@@ -408,7 +549,8 @@ async def chatbot_interaction(request: ChatbotRequest, background_tasks: Backgro
                 priority=classification['priority'],
                 category=classification['category']
             ),
-            background_tasks=background_tasks
+            background_tasks=background_tasks,
+            uow=uow
         )
         
         # Generate personalized response
@@ -483,7 +625,7 @@ async def chatbot_feedback(
 async def chatbot_follow_up(ticket_id: UUID):
     """Proactive follow-up on tickets"""
     try:
-        ticket = TicketModel.get_by_id(ticket_id)
+        ticket = await AsyncTicketModel.get_by_id(ticket_id)
         
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
@@ -533,7 +675,7 @@ def _enhance_description(message: str, context: Optional[Dict]) -> str:
 
 def _generate_ticket_response(ticket: Dict, classification: Dict, employee: str, context: Optional[Dict]) -> str:
     """Generate personalized ticket creation response"""
-    response = f"✅ I've created support ticket #{ticket['id'][:8]} for you.\n\n"
+    response = f"✅ I've created support ticket #{str(ticket['id'])[:8]} for you.\n\n"
     response += f"📋 **Details:**\n"
     response += f"• Category: {classification['category'].title()}\n"
     response += f"• Priority: {classification['priority'].title()}\n"
@@ -547,13 +689,22 @@ def _generate_ticket_response(ticket: Dict, classification: Dict, employee: str,
     
     return response
 
+@app.get("/metrics")
+async def metrics():
+    """Inference metrics: classification routing and micro-batching counters"""
+    return {
+        "classifier": get_inference_pool().get_classifier_stats(),
+        "batcher": get_classify_batcher().get_stats() if settings.MICROBATCH_ENABLED else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
         # Test database connection
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT 1")
+        async with get_async_connection() as conn:
+            await conn.fetchval("SELECT 1")
         
         return {
             "status": "healthy",
@@ -568,6 +719,16 @@ async def health_check():
             "timestamp": datetime.now().isoformat()
         }
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint: 200 once AI models are loaded and warmed up, 503 before.
+    Unlike /health this reflects model state, not database connectivity.
+    """
+    status = get_inference_pool().get_status()
+    status["timestamp"] = datetime.now().isoformat()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,214 @@
+"""
+Lazy model registry with a RAM budget, idle unloading and warm-up
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+def _weights_mb(instance: Any) -> float:
+    """
+    MB of the torch parameters and buffers held by `instance` or its
+    attributes (0 if there are none, e.g. ONNX Runtime sessions)
+    """
+    candidates = [instance] + list(getattr(instance, "__dict__", {}).values())
+    seen = set()
+    total = 0
+    for module in candidates:
+        if not (callable(getattr(module, "parameters", None)) and callable(getattr(module, "buffers", None))):
+            continue
+        for tensor in itertools.chain(module.parameters(), module.buffers()):
+            # Shared (tied) weights are counted once
+            if tensor.data_ptr() in seen:
+                continue
+            seen.add(tensor.data_ptr())
+            total += tensor.numel() * tensor.element_size()
+    return total / (1024 * 1024)
+
+class ModelEntry:
+    """A registered model and its load state"""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        size_mb: float,
+        warmup: Optional[Callable[[Any], None]] = None
+    ):
+        self.name = name
+        self.loader = loader
+        self.size_mb = size_mb
+        self.warmup = warmup
+        self.instance: Any = None
+        self.last_used = 0.0
+        self.load_seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+class ModelRegistry:
+    """
+    Loads models on first use and keeps track of what is resident.
+
+    Before a model is loaded, least-recently-used idle models are unloaded
+    until the estimated total fits in MODEL_MEMORY_BUDGET_MB. Models unused
+    for MODEL_IDLE_UNLOAD_SECONDS are dropped by `unload_idle()`. Unloading
+    only drops the registry's reference; callers holding the instance can
+    finish their request.
+    """
+
+    def __init__(self, memory_budget_mb: float = 0, idle_unload_seconds: float = 0):
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_unload_seconds = idle_unload_seconds
+        self._entries: Dict[str, ModelEntry] = {}
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        size_mb: float,
+        warmup: Optional[Callable[[Any], None]] = None
+    ):
+        """Register a model loader with its estimated resident size"""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = ModelEntry(name, loader, size_mb, warmup)
+
+    def get(self, name: str) -> Any:
+        """Return the model instance, loading it if needed"""
+        entry = self._entries[name]
+        instance = entry.instance
+        if instance is None:
+            with entry.lock:
+                if entry.instance is None:
+                    self._make_room(entry)
+                    self._load(entry)
+                instance = entry.instance
+        entry.last_used = time.monotonic()
+        return instance
+
+    def _load(self, entry: ModelEntry):
+        logger.info(f"Loading model '{entry.name}'...")
+        start = time.perf_counter()
+
+        entry.instance = entry.loader()
+
+        entry.load_seconds = round(time.perf_counter() - start, 2)
+        # Size from the model's own weights: process RSS would also count
+        # whatever other threads allocated during the load
+        measured = _weights_mb(entry.instance)
+        if measured > 0:
+            entry.size_mb = round(measured, 1)
+        logger.info(f"Model '{entry.name}' loaded in {entry.load_seconds}s (~{entry.size_mb} MB)")
+
+    def _make_room(self, entry: ModelEntry):
+        """Unload least-recently-used models until `entry` fits in the budget"""
+        if self.memory_budget_mb <= 0:
+            return
+
+        with self._lock:
+            loaded = sorted(
+                (e for e in self._entries.values() if e.instance is not None and e is not entry),
+                key=lambda e: e.last_used
+            )
+            total = sum(e.size_mb for e in loaded) + entry.size_mb
+            for victim in loaded:
+                if total <= self.memory_budget_mb:
+                    break
+                logger.info(f"Memory budget {self.memory_budget_mb} MB: unloading '{victim.name}'")
+                self.unload(victim.name)
+                total -= victim.size_mb
+
+            if total > self.memory_budget_mb:
+                logger.warning(
+                    f"Loading '{entry.name}' exceeds the memory budget "
+                    f"({total:.0f} MB > {self.memory_budget_mb} MB)"
+                )
+
+    def unload(self, name: str):
+        """Drop a loaded model"""
+        entry = self._entries[name]
+        if entry.instance is not None:
+            entry.instance = None
+            logger.info(f"Model '{name}' unloaded")
+            try:
+                import gc
+                gc.collect()
+                import torch
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except ImportError:
+                pass
+
+    def unload_idle(self) -> List[str]:
+        """Unload models unused for longer than idle_unload_seconds"""
+        if self.idle_unload_seconds <= 0:
+            return []
+
+        now = time.monotonic()
+        unloaded = []
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.instance is not None and now - entry.last_used > self.idle_unload_seconds:
+                    self.unload(entry.name)
+                    unloaded.append(entry.name)
+        return unloaded
+
+    def warm_up(self, names: Optional[List[str]] = None):
+        """Load models and run a dummy inference so buffers are allocated"""
+        for name in names or list(self._entries):
+            entry = self._entries[name]
+            instance = self.get(name)
+            if entry.warmup is not None:
+                try:
+                    entry.warmup(instance)
+                except Exception as e:
+                    logger.warning(f"Warm-up inference for '{name}' failed: {e}")
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entries[name].instance is not None
+
+    def status(self) -> Dict[str, Dict]:
+        """Load state of every registered model"""
+        now = time.monotonic()
+        return {
+            name: {
+                "loaded": entry.instance is not None,
+                "size_mb": entry.size_mb,
+                "load_seconds": entry.load_seconds,
+                "idle_seconds": round(now - entry.last_used, 1) if entry.instance is not None else None
+            }
+            for name, entry in self._entries.items()
+        }
+
+    def start_idle_reaper(self, interval_seconds: float = 60) -> Optional[threading.Thread]:
+        """Unload idle models periodically from a daemon thread"""
+        if self.idle_unload_seconds <= 0:
+            return None
+
+        def reap():
+            while True:
+                time.sleep(interval_seconds)
+                self.unload_idle()
+
+        thread = threading.Thread(target=reap, name="model-idle-reaper", daemon=True)
+        thread.start()
+        return thread
+
+# Global model registry instance
+_model_registry = None
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create model registry instance (singleton pattern)"""
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry(
+            memory_budget_mb=settings.MODEL_MEMORY_BUDGET_MB,
+            idle_unload_seconds=settings.MODEL_IDLE_UNLOAD_SECONDS
+        )
+    return _model_registry
@@ -5,8 +5,24 @@ Database models and operations
 from typing import List, Optional, Dict, Any
 from uuid import UUID, uuid4
 from datetime import datetime
+from psycopg2.extras import execute_values
+
 from database import get_db_cursor
 
+# Status change that also returns the previous status: the CTE reads the row
+# (locked, so concurrent transitions serialize) before the UPDATE changes it
+TICKET_STATUS_TRANSITION_SQL = """
+    WITH previous AS (
+        SELECT id, status FROM tickets WHERE id = {ticket_id} FOR UPDATE
+    )
+    UPDATE tickets AS t
+    SET status = {status}, updated_at = CURRENT_TIMESTAMP
+    FROM previous
+    WHERE t.id = previous.id
+    RETURNING t.id, t.source, t.employee, t.subject, t.description, t.priority, t.category,
+              t.assigned_team, t.status, t.created_at, t.updated_at, previous.status AS old_status
+"""
+
 class TicketModel:
     """Ticket database operations"""
     
@@ -77,6 +93,20 @@ class TicketModel:
             cursor.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
     
+    @staticmethod
+    def get_recent_by_category(category: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the most recent ticket texts for a category (used to build classifier prototypes)"""
+        with get_db_cursor() as cursor:
+            cursor.execute("""
+                SELECT subject, description
+                FROM tickets
+                WHERE category = %s
+                ORDER BY created_at DESC
+                LIMIT %s
+            """, (category, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
     @staticmethod
     def update_status(ticket_id: UUID, status: str) -> Optional[Dict[str, Any]]:
         """Update ticket status"""
@@ -90,24 +120,44 @@ class TicketModel:
             
             result = cursor.fetchone()
             return dict(result) if result else None
+    
+    @staticmethod
+    def transition_status(ticket_id: UUID, status: str) -> Optional[Dict[str, Any]]:
+        """
+        Set a ticket's status in one statement. The returned ticket also has
+        its previous `old_status`; None if the ticket doesn't exist.
+        """
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                TICKET_STATUS_TRANSITION_SQL.format(ticket_id="%s", status="%s"),
+                (str(ticket_id), status)
+            )
+            
+            result = cursor.fetchone()
+            return dict(result) if result else None
+
+# Hash of the text a KB embedding is computed from (title + content), as
+# stored in knowledge_base.content_hash by scripts/04-generate-embeddings.py
+KB_CONTENT_HASH_SQL = "md5(title || E'\\n\\n' || content)"
 
 class KnowledgeBaseModel:
     """Knowledge Base database operations"""
     
     @staticmethod
-    def search_by_keywords(query: str, limit: int = 3) -> List[Dict[str, Any]]:
-        """Search KB by keywords (simple text search)"""
+    def search_by_keywords(query: str, limit: int = 3, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search KB by keywords (simple text search), optionally within one category"""
         with get_db_cursor() as cursor:
             cursor.execute("""
                 SELECT id, title, content, category, views, helpful_count
                 FROM knowledge_base
                 WHERE 
-                    LOWER(title) LIKE LOWER(%s) OR
-                    LOWER(content) LIKE LOWER(%s) OR
-                    %s = ANY(keywords)
+                    (LOWER(title) LIKE LOWER(%s) OR
+                     LOWER(content) LIKE LOWER(%s) OR
+                     %s = ANY(keywords))
+                    AND (%s::text IS NULL OR category = %s)
                 ORDER BY helpful_count DESC, views DESC
                 LIMIT %s
-            """, (f"%{query}%", f"%{query}%", query.lower(), limit))
+            """, (f"%{query}%", f"%{query}%", query.lower(), category, category, limit))
             
             return [dict(row) for row in cursor.fetchall()]
     
@@ -139,9 +189,116 @@ class KnowledgeBaseModel:
         """Get all KB articles with embeddings for semantic search"""
         with get_db_cursor() as cursor:
             cursor.execute("""
-                SELECT id, title, content, category, embedding
+                SELECT id, title, content, category, keywords, updated_at, embedding
                 FROM knowledge_base
                 WHERE embedding IS NOT NULL
             """)
             
             return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def get_updated_since(since: Optional[datetime]) -> List[Dict[str, Any]]:
+        """Get KB articles (with embeddings) changed at or after `since` (all if None)"""
+        with get_db_cursor() as cursor:
+            cursor.execute("""
+                SELECT id, title, content, category, keywords, updated_at, embedding
+                FROM knowledge_base
+                WHERE embedding IS NOT NULL
+                  AND (%s::timestamptz IS NULL OR updated_at >= %s::timestamptz)
+                ORDER BY updated_at
+            """, (since, since))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def get_embedded_ids() -> List[str]:
+        """IDs of all KB articles that have an embedding"""
+        with get_db_cursor() as cursor:
+            cursor.execute("""
+                SELECT id FROM knowledge_base
+                WHERE embedding IS NOT NULL
+            """)
+            
+            return [str(row['id']) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def count_with_embeddings() -> int:
+        """Number of KB articles that have an embedding"""
+        with get_db_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) AS count FROM knowledge_base WHERE embedding IS NOT NULL")
+            return cursor.fetchone()['count']
+    
+    @staticmethod
+    def search_by_vector(
+        embedding: List[float],
+        limit: int = 3,
+        ef_search: int = 0,
+        category: Optional[str] = None,
+        iterative_scan: str = ""
+    ) -> List[Dict[str, Any]]:
+        """
+        Nearest KB articles by cosine distance, ranked inside Postgres
+        (uses the pgvector HNSW index from 05-create-vector-index.sql),
+        optionally within one category. The category filter is applied to
+        the ef_search candidates the index scan returns, so a filtered search
+        needs a larger ef_search or an iterative scan (pgvector >= 0.8).
+        """
+        vector = "[" + ",".join(f"{value:.7g}" for value in embedding) + "]"
+        with get_db_cursor() as cursor:
+            if ef_search > 0:
+                # Candidate list size for HNSW; must be >= limit for full recall
+                cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
+            if iterative_scan:
+                # Keep scanning the graph until `limit` rows pass the filter
+                cursor.execute("SELECT set_config('hnsw.iterative_scan', %s, true)", (iterative_scan,))
+            cursor.execute("""
+                SELECT id, title, content, category,
+                       1 - (embedding <=> %s::vector) AS relevance_score
+                FROM knowledge_base
+                WHERE embedding IS NOT NULL
+                  AND (%s::text IS NULL OR category = %s)
+                ORDER BY embedding <=> %s::vector
+                LIMIT %s
+            """, (vector, category, category, vector, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def get_stale_embeddings(model_id: str, limit: int = 64) -> List[Dict[str, Any]]:
+        """
+        KB articles whose embedding is missing, was computed from an older
+        title/content or by another model, with the hash of their current text
+        """
+        with get_db_cursor() as cursor:
+            cursor.execute(f"""
+                SELECT id, title, content, {KB_CONTENT_HASH_SQL} AS content_hash
+                FROM knowledge_base
+                WHERE embedding IS NULL
+                   OR embedding_model IS DISTINCT FROM %s
+                   OR content_hash IS DISTINCT FROM {KB_CONTENT_HASH_SQL}
+                LIMIT %s
+            """, (model_id, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def update_embeddings(rows: List[Dict[str, Any]], model_id: str) -> int:
+        """
+        Store new embeddings ({id, embedding, content_hash} per row). Rows
+        whose text changed again since it was read are left stale.
+        Returns the number of articles updated.
+        """
+        if not rows:
+            return 0
+        values = [
+            (str(row['id']), "[" + ",".join(f"{value:.7g}" for value in row['embedding']) + "]", row['content_hash'], model_id)
+            for row in rows
+        ]
+        with get_db_cursor() as cursor:
+            execute_values(cursor, f"""
+                UPDATE knowledge_base AS kb
+                SET embedding = v.embedding, content_hash = v.content_hash, embedding_model = v.embedding_model
+                FROM (VALUES %s) AS v(id, embedding, content_hash, embedding_model)
+                WHERE kb.id = v.id AND {KB_CONTENT_HASH_SQL} = v.content_hash
+            """, values, template="(%s::uuid, %s::vector, %s, %s)", page_size=len(values))
+            return cursor.rowcount
@@ -0,0 +1,222 @@
+"""
+ONNX Runtime inference backend (int8 dynamically quantized models).
+
+Export once, then run with INFERENCE_BACKEND=onnx:
+    python onnx_backend.py export --output-dir ./onnx_models
+"""
+
+import argparse
+import logging
+import os
+from typing import List, Union
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+NLI_MODEL_NAME = "facebook/bart-large-mnli"
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+NLI_SUBDIR = "bart-large-mnli"
+EMBEDDING_SUBDIR = "all-MiniLM-L6-v2"
+QUANTIZED_FILE = "model-int8.onnx"
+
+# all-MiniLM-L6-v2 is configured with max_seq_length=256 in sentence-transformers
+EMBEDDING_MAX_LENGTH = 256
+
+def _load_session(path: str):
+    """Create an ONNX Runtime session on CPU"""
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise ImportError(
+            "onnxruntime is required for INFERENCE_BACKEND=onnx "
+            "(pip install -r requirements-onnx.txt)"
+        ) from e
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"ONNX model not found at {path}. Run `python onnx_backend.py export` first."
+        )
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.INFERENCE_THREADS_PER_WORKER > 0:
+        options.intra_op_num_threads = settings.INFERENCE_THREADS_PER_WORKER
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+class OnnxNLIModel:
+    """
+    Quantized BART-MNLI sequence classifier.
+    Exposes the tokenizer/config the zero-shot code needs plus a `logits` call.
+    """
+
+    def __init__(self, model_dir: str = None):
+        from transformers import AutoConfig, AutoTokenizer
+
+        model_dir = os.path.join(model_dir or settings.ONNX_MODEL_DIR, NLI_SUBDIR)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.config = AutoConfig.from_pretrained(model_dir)
+        self.session = _load_session(os.path.join(model_dir, QUANTIZED_FILE))
+        logger.info(f"Loaded ONNX NLI model from {model_dir}")
+
+    def logits(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Return (rows, num_labels) logits"""
+        return self.session.run(
+            ["logits"],
+            {"input_ids": input_ids.astype(np.int64), "attention_mask": attention_mask.astype(np.int64)}
+        )[0]
+
+class OnnxSentenceEncoder:
+    """
+    Quantized all-MiniLM-L6-v2 encoder with the same `encode` interface as
+    SentenceTransformer (mean pooling + L2 normalization, as in the original model)
+    """
+
+    def __init__(self, model_dir: str = None):
+        from transformers import AutoTokenizer
+
+        model_dir = os.path.join(model_dir or settings.ONNX_MODEL_DIR, EMBEDDING_SUBDIR)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = _load_session(os.path.join(model_dir, QUANTIZED_FILE))
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX sentence encoder from {model_dir}")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 384
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        chunks = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=EMBEDDING_MAX_LENGTH,
+                return_tensors="np"
+            )
+            feeds = {
+                name: encoded[name].astype(np.int64)
+                for name in ("input_ids", "attention_mask", "token_type_ids")
+                if name in self._input_names and name in encoded
+            }
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+            # Mean pooling over real tokens
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            # all-MiniLM-L6-v2 ends with a Normalize module
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            chunks.append(pooled.astype(np.float32))
+
+        embeddings = np.vstack(chunks) if chunks else np.zeros((0, 384), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+def _quantize(fp32_path: str, int8_path: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    logger.info(f"Quantized model written to {int8_path}")
+
+def export_nli_model(output_dir: str):
+    """Export BART-MNLI to ONNX and quantize its weights to int8"""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    target = os.path.join(output_dir, NLI_SUBDIR)
+    os.makedirs(target, exist_ok=True)
+
+    logger.info(f"Exporting {NLI_MODEL_NAME}...")
+    tokenizer = AutoTokenizer.from_pretrained(NLI_MODEL_NAME)
+    model = AutoModelForSequenceClassification.from_pretrained(NLI_MODEL_NAME)
+    model.config.return_dict = False
+    model.eval()
+
+    sample = tokenizer("The VPN is down.", "This example is network issues.", return_tensors="pt")
+    fp32_path = os.path.join(target, "model.onnx")
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"}
+            },
+            opset_version=14
+        )
+
+    _quantize(fp32_path, os.path.join(target, QUANTIZED_FILE))
+    tokenizer.save_pretrained(target)
+    model.config.return_dict = True
+    model.config.save_pretrained(target)
+
+def export_embedding_model(output_dir: str):
+    """Export the MiniLM transformer to ONNX and quantize its weights to int8"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    target = os.path.join(output_dir, EMBEDDING_SUBDIR)
+    os.makedirs(target, exist_ok=True)
+
+    logger.info(f"Exporting {EMBEDDING_MODEL_NAME}...")
+    tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+    model = AutoModel.from_pretrained(EMBEDDING_MODEL_NAME)
+    model.config.return_dict = False
+    model.eval()
+
+    sample = tokenizer(["How do I reset my password?"], return_tensors="pt")
+    fp32_path = os.path.join(target, "model.onnx")
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "token_type_ids": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"}
+            },
+            opset_version=14
+        )
+
+    _quantize(fp32_path, os.path.join(target, QUANTIZED_FILE))
+    tokenizer.save_pretrained(target)
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="ONNX Runtime backend tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export and int8-quantize both models")
+    export_parser.add_argument("--output-dir", default=settings.ONNX_MODEL_DIR)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_nli_model(args.output_dir)
+        export_embedding_model(args.output_dir)
+        logger.info(f"ONNX models ready in {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
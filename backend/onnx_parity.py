@@ -0,0 +1,130 @@
+"""
+Parity check: ONNX (int8) backend vs PyTorch backend.
+
+Reports category agreement and score drift for the classifier, and cosine
+similarity / top-k overlap for the search encoder.
+
+    python onnx_parity.py                 # built-in sample texts
+    python onnx_parity.py --from-db 500   # plus recent tickets and KB articles
+"""
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from ai_classifier import TicketClassifier
+from semantic_search import SemanticSearchEngine
+
+SAMPLE_TEXTS = [
+    "I cannot connect to VPN from home. Getting connection failed error.",
+    "My password has expired and I need to reset it urgently.",
+    "Laptop screen is flickering and sometimes goes black.",
+    "Need Microsoft Office license for new project.",
+    "Cannot access the shared drive S:\\Engineering folder.",
+    "WiFi on the 4th floor keeps dropping during video calls.",
+    "Outlook crashes every time I open a PDF attachment.",
+    "Printer in the control room is out of toner and shows error E13.",
+    "SAP login shows account locked after the password change.",
+    "Request a second monitor for the SCADA workstation.",
+]
+
+def load_texts_from_db(limit: int) -> List[str]:
+    """Recent ticket texts and KB article texts"""
+    from database import get_db_cursor
+
+    with get_db_cursor() as cursor:
+        cursor.execute("""
+            SELECT subject || '. ' || description AS text
+            FROM tickets
+            ORDER BY created_at DESC
+            LIMIT %s
+        """, (limit,))
+        texts = [row['text'] for row in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT title || E'\\n\\n' || content AS text
+            FROM knowledge_base
+            LIMIT %s
+        """, (limit,))
+        texts.extend(row['text'] for row in cursor.fetchall())
+
+    return texts
+
+def check_classifier(texts: List[str]):
+    print("\n" + "="*60)
+    print("Classifier parity (BART-MNLI)")
+    print("="*60)
+
+    torch_classifier = TicketClassifier(backend="torch")
+    onnx_classifier = TicketClassifier(backend="onnx")
+
+    start = time.perf_counter()
+    torch_results = torch_classifier._fast_zero_shot_batch(texts)
+    torch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    onnx_results = onnx_classifier._fast_zero_shot_batch(texts)
+    onnx_time = time.perf_counter() - start
+
+    agreement = np.mean([a[0] == b[0] for a, b in zip(torch_results, onnx_results)])
+    score_diffs = np.array([abs(a[1] - b[1]) for a, b in zip(torch_results, onnx_results)])
+
+    print(f"Texts: {len(texts)}")
+    print(f"Category agreement: {agreement * 100:.1f}%")
+    print(f"Top score drift: mean {score_diffs.mean():.4f}, max {score_diffs.max():.4f}")
+    print(f"Latency: torch {torch_time:.2f}s, onnx {onnx_time:.2f}s ({torch_time / onnx_time:.2f}x)")
+
+    for text, a, b in zip(texts, torch_results, onnx_results):
+        if a[0] != b[0]:
+            print(f"  Disagreement: torch={a[0]} onnx={b[0]} :: {text[:70]}")
+
+def check_encoder(texts: List[str], k: int = 3):
+    print("\n" + "="*60)
+    print("Search encoder parity (all-MiniLM-L6-v2)")
+    print("="*60)
+
+    torch_encoder = SemanticSearchEngine(backend="torch").model
+    onnx_encoder = SemanticSearchEngine(backend="onnx").model
+
+    start = time.perf_counter()
+    torch_vectors = torch_encoder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    torch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    onnx_vectors = onnx_encoder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    onnx_time = time.perf_counter() - start
+
+    cosines = np.sum(torch_vectors * onnx_vectors, axis=1)
+    print(f"Texts: {len(texts)}")
+    print(f"Cosine(torch, onnx): mean {cosines.mean():.4f}, min {cosines.min():.4f}")
+
+    # Top-k neighbour overlap within the sample, a proxy for ranking drift
+    k = min(k, len(texts) - 1)
+    if k > 0:
+        torch_sims = torch_vectors @ torch_vectors.T
+        onnx_sims = onnx_vectors @ onnx_vectors.T
+        np.fill_diagonal(torch_sims, -np.inf)
+        np.fill_diagonal(onnx_sims, -np.inf)
+        torch_top = np.argsort(-torch_sims, axis=1)[:, :k]
+        onnx_top = np.argsort(-onnx_sims, axis=1)[:, :k]
+        overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(torch_top, onnx_top)])
+        print(f"Top-{k} neighbour overlap: {overlap * 100:.1f}%")
+
+    print(f"Latency: torch {torch_time:.2f}s, onnx {onnx_time:.2f}s ({torch_time / onnx_time:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ONNX and PyTorch inference backends")
+    parser.add_argument("--from-db", type=int, default=0, help="Also use N recent tickets and N KB articles")
+    args = parser.parse_args()
+
+    texts = list(SAMPLE_TEXTS)
+    if args.from_db:
+        texts.extend(load_texts_from_db(args.from_db))
+
+    check_classifier(texts)
+    check_encoder(texts)
+
+if __name__ == "__main__":
+    main()
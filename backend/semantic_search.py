@@ -4,109 +4,734 @@ Semantic search for knowledge base using sentence transformers
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import hashlib
 import logging
+import os
+import threading
+import time
 
+from bm25_index import BM25Index, article_tokens, reciprocal_rank_fusion
+from config import settings
+from embedding_store import get_embedding_store
+from model_registry import get_model_registry
 from models import KnowledgeBaseModel
+from text_budget import chunk_text, fit_to_budget, make_snippet, select_fields
+from vector_index import ExactIndex, IVFIndex, IVFSubset, VectorIndex, load_index
 
 logger = logging.getLogger(__name__)
 
+# Incremental refreshes re-read rows this far behind the watermark, so an edit
+# committed late (updated_at is the transaction start time) is not missed
+WATERMARK_OVERLAP = timedelta(seconds=30)
+
+def to_vector(value) -> Optional[np.ndarray]:
+    """
+    Convert a stored embedding to a float32 vector. Accepts lists/arrays and the
+    text forms psycopg2 returns for pgvector ('[0.1,...]') or arrays ('{0.1,...}').
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip().strip('[]{}')
+        if not value:
+            return None
+        return np.array(value.split(','), dtype=np.float32)
+    vector = np.asarray(value, dtype=np.float32)
+    return vector if vector.size else None
+
+def _as_datetime(value) -> Optional[datetime]:
+    """updated_at from the database (datetime) or the embedding store (string)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row in place (zero rows are left as zeros)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
 class SemanticSearchEngine:
     """
     Semantic search engine using sentence transformers
     """
     
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or settings.INFERENCE_BACKEND
         logger.info("Loading sentence transformer model...")
-        self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+        if self.backend == "onnx":
+            from onnx_backend import OnnxSentenceEncoder
+            self.model = OnnxSentenceEncoder()
+        else:
+            self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
         logger.info("Sentence transformer loaded successfully!")
         
-        # Cache for KB embeddings
+        # Cache for KB embeddings: a vector index over the L2-normalized
+        # float32 embeddings (keyed by row) plus the article metadata by row
         self._kb_cache = None
         self._cache_timestamp = None
+        # In-process ranking, or ranking pushed down to pgvector (decided on first use)
+        self._use_database: Optional[bool] = None
+        # Per-category sub-indexes over the same rows (keys are global rows):
+        # slices of an exact index, key subsets of an IVF index
+        self._category_indexes: Dict[str, VectorIndex] = {}
+        # BM25 index over the same rows, for lexical and hybrid search
+        self._bm25 = BM25Index()
+        # Index keys are row * stride + passage: passage 0 is the stored
+        # whole-article embedding, passages 1.. are the sections of long
+        # articles (SEARCH_PASSAGES), whose texts are kept by row
+        self._passage_stride = settings.PASSAGE_MAX_PER_ARTICLE + 1 if settings.SEARCH_PASSAGES else 1
+        self._passages: Dict[int, List[str]] = {}
+        # Row of each article id and newest updated_at seen, for incremental refresh
+        self._row_of_id: Dict[str, int] = {}
+        self._watermark: Optional[datetime] = None
+        # Guards the index/articles against patching while a search reads them
+        self._kb_lock = threading.RLock()
     
-    def _load_kb_embeddings(self) -> List[Dict]:
-        """Load KB articles with embeddings from database"""
-        articles = KnowledgeBaseModel.get_all_with_embeddings()
+    def _load_kb_embeddings(self) -> Tuple[VectorIndex, List[Dict], Dict[str, VectorIndex], Dict[int, List[str]]]:
+        """
+        Load KB articles with embeddings (store or database) and index them.
+        Returns (index, articles, per-category sub-indexes, section texts by row)
+        """
+        store = get_embedding_store()
+        if store is not None and store.exists():
+            try:
+                matrix, articles = store.load()
+                if matrix.shape[1] == self.model.get_sentence_embedding_dimension() or not articles:
+                    logger.info(f"Memory-mapped {len(articles)} KB embeddings from {store.path}")
+                    return self._index_articles(matrix, articles)
+                logger.warning("Embedding store dimension does not match the model, loading from database")
+            except Exception as e:
+                logger.warning(f"Could not load embedding store ({e}), loading from database")
+        
+        rows = KnowledgeBaseModel.get_all_with_embeddings()
         
-        # Convert embedding arrays to numpy
-        for article in articles:
-            if article.get('embedding'):
-                article['embedding'] = np.array(article['embedding'])
+        vectors, articles = [], []
+        for row in rows:
+            vector = to_vector(row.pop('embedding', None))
+            if vector is None:
+                continue
+            vectors.append(vector)
+            articles.append(row)
         
-        return articles
+        dims = self.model.get_sentence_embedding_dimension()
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1) if vectors else np.zeros((0, dims), dtype=np.float32)
+        return self._index_articles(normalize_rows(matrix), articles)
     
-    def _get_kb_cache(self) -> List[Dict]:
+    def _index_articles(
+        self,
+        matrix: np.ndarray,
+        articles: List[Dict]
+    ) -> Tuple[VectorIndex, List[Dict], Dict[str, VectorIndex], Dict[int, List[str]]]:
+        """
+        Group rows by category (a stable reorder, skipped when the rows are
+        already grouped, as the embedding store writes them) so that each
+        category sub-index is a zero-copy slice of the indexed rows. An IVF
+        index is not sliceable; its category sub-indexes are key subsets
+        searched through the IVF lists, so no second copy of the vectors is kept.
+        """
+        categories = np.array([article.get('category') or 'other' for article in articles], dtype=object)
+        order = np.argsort(categories, kind='stable') if len(articles) else np.zeros(0, dtype=np.int64)
+        if not np.array_equal(order, np.arange(len(articles))):
+            if isinstance(matrix, np.memmap):
+                logger.warning(
+                    "Embedding store rows are not grouped by category; each worker keeps a private "
+                    "copy and float32 rescoring is off until the store is rewritten"
+                )
+            matrix = np.ascontiguousarray(matrix[order])
+            articles = [articles[i] for i in order]
+            categories = categories[order]
+        
+        # Quantized storage can rescore from the memory-mapped float32 store
+        # (page cache, not process RAM); a reordered copy is not kept for that
+        dtype = settings.SEARCH_VECTOR_DTYPE
+        rescore_source = None
+        if dtype != "float32" and settings.SEARCH_RESCORE:
+            if self._passage_stride > 1:
+                logger.info("The embedding store has no passage vectors; searching quantized vectors only")
+            elif isinstance(matrix, np.memmap):
+                rescore_source = matrix
+            elif get_embedding_store() is None:
+                logger.info("float32 rescoring needs the embedding store; searching quantized vectors only")
+        
+        # Passages of an article follow it, so the category grouping still holds
+        keys, matrix, passages = self._passage_vectors(list(range(len(articles))), articles, matrix)
+        categories = categories[keys // self._passage_stride]
+        
+        index = self._build_index(keys, matrix, articles, rescore_source)
+        
+        partitions = {}
+        boundaries = np.flatnonzero(categories[1:] != categories[:-1]) + 1 if len(keys) else []
+        for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(keys)]):
+            if end > start:
+                if isinstance(index, ExactIndex):
+                    partitions[categories[start]] = index.slice(start, end)
+                else:
+                    partitions[categories[start]] = IVFSubset(index, keys[start:end])
+        
+        return index, articles, partitions, passages
+    
+    def _passage_vectors(
+        self,
+        rows: List[int],
+        articles: List[Dict],
+        vectors: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[int, List[str]]]:
+        """
+        Index keys and vectors for the given article rows (and their stored
+        embeddings). In passage mode every article whose content spans more
+        than one PASSAGE_MAX_TOKENS section also gets a vector per section,
+        encoded together with the title. Returns (keys, vectors, section texts by row).
+        """
+        stride = self._passage_stride
+        if stride == 1:
+            return np.asarray(rows, dtype=np.int64), vectors, {}
+        
+        tokenizer = self.model.tokenizer
+        sections = {}
+        for row, article in zip(rows, articles):
+            chunks = chunk_text(
+                article.get('content') or '', tokenizer,
+                settings.PASSAGE_MAX_TOKENS, settings.PASSAGE_MAX_PER_ARTICLE, subject=""
+            )
+            if len(chunks) > 1:
+                sections[row] = chunks
+        
+        texts = [
+            f"{article.get('title') or ''}\n{chunk}"
+            for row, article in zip(rows, articles) for chunk in sections.get(row, [])
+        ]
+        encoded = iter(np.asarray(
+            self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True), dtype=np.float32
+        ) if texts else [])
+        
+        keys, passage_vectors = [], []
+        for i, row in enumerate(rows):
+            keys.append(row * stride)
+            passage_vectors.append(vectors[i])
+            for passage in range(1, len(sections.get(row, [])) + 1):
+                keys.append(row * stride + passage)
+                passage_vectors.append(next(encoded))
+        
+        matrix = np.asarray(passage_vectors, dtype=np.float32).reshape(len(keys), vectors.shape[1])
+        if len(sections):
+            logger.info(f"Indexed {len(keys) - len(rows)} passages of {len(sections)} long KB articles")
+        return np.asarray(keys, dtype=np.int64), matrix, sections
+    
+    def _build_index(
+        self,
+        keys: np.ndarray,
+        matrix: np.ndarray,
+        articles: List[Dict],
+        rescore_source: Optional[np.ndarray] = None
+    ) -> VectorIndex:
+        """
+        Exact index for small KBs, IVF once SEARCH_INDEX asks for it (or "auto"
+        and the KB has ANN_MIN_ARTICLES articles). A saved index at
+        SEARCH_INDEX_PATH is reused when it was built from the same data;
+        otherwise (e.g. articles changed since) its trained quantizer still is,
+        so only the vectors are reassigned to lists.
+        """
+        kind = settings.SEARCH_INDEX
+        if kind == "auto":
+            kind = "ivf" if len(articles) >= settings.ANN_MIN_ARTICLES else "exact"
+        if kind != "ivf" or len(articles) == 0:
+            return ExactIndex.from_arrays(keys, matrix, settings.SEARCH_VECTOR_DTYPE, rescore_source)
+        
+        digest = hashlib.sha1(matrix.tobytes())
+        digest.update(keys.tobytes())
+        digest.update("|".join(str(article['id']) for article in articles).encode())
+        # Build parameters too, so changing them rebuilds instead of loading a stale index
+        digest.update(f"{settings.SEARCH_VECTOR_DTYPE}|{settings.IVF_NLIST}".encode())
+        fingerprint = digest.hexdigest()
+        
+        path = settings.SEARCH_INDEX_PATH
+        saved = None
+        if path and os.path.exists(path):
+            try:
+                saved = load_index(path)
+                if saved.fingerprint == fingerprint:
+                    saved.nprobe = settings.IVF_NPROBE
+                    logger.info(f"Loaded saved KB index from {path}")
+                    return saved
+            except Exception as e:
+                logger.warning(f"Could not load saved KB index ({e}), rebuilding")
+        
+        index = IVFIndex(
+            matrix.shape[1], nlist=settings.IVF_NLIST, nprobe=settings.IVF_NPROBE,
+            dtype=settings.SEARCH_VECTOR_DTYPE
+        )
+        if isinstance(saved, IVFIndex) and saved.is_trained and saved.dim == index.dim \
+                and settings.IVF_NLIST in (0, saved.nlist) and saved.nlist <= len(matrix):
+            logger.info(f"KB changed since {path} was saved; reusing its {saved.nlist}-list quantizer")
+            index.set_centroids(saved.centroids)
+        else:
+            index.train(matrix)
+        # Free the saved lists before filling the new ones
+        saved = None
+        index.add(keys, matrix)
+        index.fingerprint = fingerprint
+        if path:
+            try:
+                index.save(path)
+            except Exception as e:
+                logger.warning(f"Could not save KB index to {path}: {e}")
+        return index
+    
+    def _set_kb_cache(self, loaded: Tuple[VectorIndex, List[Dict], Dict[str, VectorIndex], Dict[int, List[str]]]):
+        """Swap in a freshly loaded cache and reset the refresh bookkeeping"""
+        index, articles, partitions, passages = loaded
+        timestamps = [t for t in (_as_datetime(a.get('updated_at')) for a in articles) if t is not None]
+        bm25 = BM25Index.from_articles(articles)
+        with self._kb_lock:
+            self._kb_cache = (index, articles)
+            self._category_indexes = partitions
+            self._passages = passages
+            self._bm25 = bm25
+            self._row_of_id = {str(article['id']): row for row, article in enumerate(articles)}
+            self._watermark = max(timestamps) if timestamps else None
+            self._cache_timestamp = datetime.now()
+        logger.info(f"Loaded {len(articles)} KB articles")
+    
+    def _get_kb_cache(self) -> Tuple[VectorIndex, List[Dict]]:
         """Get cached KB embeddings or load from database"""
         # Simple cache - in production, use Redis or similar
         if self._kb_cache is None:
-            logger.info("Loading KB embeddings into cache...")
-            self._kb_cache = self._load_kb_embeddings()
-            logger.info(f"Loaded {len(self._kb_cache)} KB articles")
+            with self._kb_lock:
+                if self._kb_cache is None:
+                    logger.info("Loading KB embeddings into cache...")
+                    self._set_kb_cache(self._load_kb_embeddings())
         
         return self._kb_cache
     
-    def search(self, query: str, limit: int = 3) -> List[Dict]:
+    def uses_database(self) -> bool:
+        """
+        Whether searches run inside Postgres (SEARCH_BACKEND=database, or auto
+        with at least DB_SEARCH_MIN_ARTICLES embedded articles). The database
+        path keeps no KB vectors in worker memory at all.
+        """
+        if self._use_database is None:
+            backend = settings.SEARCH_BACKEND
+            if backend == "auto":
+                try:
+                    count = KnowledgeBaseModel.count_with_embeddings()
+                except Exception as e:
+                    logger.warning(f"Could not count KB articles ({e}), ranking in memory")
+                    count = 0
+                backend = "database" if count >= settings.DB_SEARCH_MIN_ARTICLES else "memory"
+                logger.info(f"KB search backend: {backend} ({count} embedded articles)")
+            self._use_database = backend == "database"
+        return self._use_database
+    
+    def _search_database(
+        self,
+        query: str,
+        query_vector: Optional[np.ndarray],
+        limit: int,
+        mode: str,
+        category: Optional[str] = None
+    ) -> List[Dict]:
+        """Rank in Postgres: pgvector for semantic, SQL keyword match for lexical, RRF of both for hybrid"""
+        if mode == "lexical":
+            return KnowledgeBaseModel.search_by_keywords(query, limit, category)
+        
+        candidates = max(limit, settings.HYBRID_CANDIDATES) if mode == "hybrid" else limit
+        # HNSW returns at most ef_search rows (server default 40) before the
+        # category filter, so ask for enough to still fill `candidates`
+        ef_search = settings.DB_SEARCH_EF_SEARCH
+        if category:
+            ef_search = max(ef_search, settings.DB_SEARCH_FILTERED_EF_SEARCH)
+        if candidates > (ef_search or 40):
+            ef_search = candidates
+        results = KnowledgeBaseModel.search_by_vector(
+            query_vector.tolist(), candidates, ef_search, category,
+            iterative_scan=settings.DB_SEARCH_ITERATIVE_SCAN if category else ""
+        )
+        for article in results:
+            article['relevance_score'] = round(float(article['relevance_score']), 4)
+        if mode != "hybrid":
+            return results
+        
+        keyword_results = KnowledgeBaseModel.search_by_keywords(query, candidates, category)
+        by_id = {str(article['id']): article for article in keyword_results + results}
+        fused = reciprocal_rank_fusion(
+            [[(str(a['id']), 0.0) for a in results], [(str(a['id']), 0.0) for a in keyword_results]],
+            limit,
+            k=settings.HYBRID_RRF_K
+        )
+        return [dict(by_id[article_id], relevance_score=round(score, 4)) for article_id, score in fused]
+    
+    def encode_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts into normalized float32 vectors, keeping each within
+        SEARCH_MAX_TOKENS (subject + most informative sentences) instead of
+        letting the encoder silently cut the tail
         """
-        Search knowledge base using semantic similarity
-        Returns articles sorted by relevance
+        tokenizer = self.model.tokenizer
+        texts = [fit_to_budget(text, tokenizer, settings.SEARCH_MAX_TOKENS) for text in texts]
+        embeddings = self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(embeddings, dtype=np.float32)
+    
+    def _rank(
+        self,
+        query_vectors: np.ndarray,
+        limit: int,
+        exact: bool = False,
+        category: Optional[str] = None
+    ) -> List[Tuple[List[Tuple[int, float]], Dict[int, int]]]:
+        """
+        Top-k articles of the KB index for each (normalized) query vector.
+        An article scores as its best passage; enough passages are fetched
+        that `limit` distinct articles are always found.
+        `exact=True` scans every IVF list instead of the nprobe nearest;
+        `category` scans only that category's sub-index.
+        Returns [([(row, score), ...] best first, {row: best passage}) per query].
+        """
+        index, _ = self._get_kb_cache()
+        if category is not None:
+            index = self._category_indexes.get(category, ExactIndex(index.dim))
+        if limit <= 0 or len(index) == 0:
+            return [([], {}) for _ in range(len(query_vectors))]
+        
+        stride = self._passage_stride
+        k = min(limit * stride, len(index))
+        if isinstance(index, (IVFIndex, IVFSubset)):
+            scores, keys = index.search(query_vectors, k, nprobe=index.nlist if exact else None)
+            # Probed lists can hold fewer than `k` passages; redo those queries exactly
+            short = (keys < 0).any(axis=1)
+            if short.any() and not exact:
+                scores[short], keys[short] = index.search(query_vectors[short], k, nprobe=index.nlist)
+        else:
+            scores, keys = index.search(query_vectors, k)
+        
+        ranked = []
+        for query_keys, query_scores in zip(keys, scores):
+            hits, best_passage = [], {}
+            for key, score in zip(query_keys.tolist(), query_scores.tolist()):
+                row = key // stride
+                if key < 0 or row in best_passage:
+                    continue
+                best_passage[row] = key % stride
+                hits.append((row, score))
+                if len(hits) == limit:
+                    break
+            ranked.append((hits, best_passage))
+        return ranked
+    
+    def _rank_lexical(self, query: str, limit: int, category: Optional[str] = None) -> List[Tuple[int, float]]:
+        """BM25 top-k rows, optionally restricted to one category"""
+        if category is None:
+            return self._bm25.search(query, limit)
+        partition = self._category_indexes.get(category)
+        if partition is None:
+            return []
+        return self._bm25.search(query, limit, allowed=set((partition.keys // self._passage_stride).tolist()))
+    
+    def _rank_hybrid(
+        self,
+        query: str,
+        query_vector: np.ndarray,
+        limit: int,
+        category: Optional[str] = None
+    ) -> Tuple[List[Tuple[int, float]], Dict[int, int]]:
+        """Reciprocal rank fusion of the vector and BM25 top HYBRID_CANDIDATES (plus the best passages)"""
+        candidates = max(limit, settings.HYBRID_CANDIDATES)
+        vector_hits, best_passage = self._rank(query_vector, candidates, category=category)[0]
+        lexical_hits = self._rank_lexical(query, candidates, category)
+        return reciprocal_rank_fusion([vector_hits, lexical_hits], limit, k=settings.HYBRID_RRF_K), best_passage
+    
+    def _snippet(self, row: int, passage: int) -> str:
+        """The matched section of a long article, or the lead of its content"""
+        article = self._kb_cache[1][row]
+        sections = self._passages.get(row)
+        text = sections[passage - 1] if sections and 0 < passage <= len(sections) else article['content']
+        return make_snippet(text or '', settings.SNIPPET_MAX_CHARS)
+    
+    def _format_results(
+        self,
+        hits: List[Tuple[int, float]],
+        best_passage: Optional[Dict[int, int]] = None,
+        fields: str = "full"
+    ) -> List[Dict]:
+        """
+        Article dicts with relevance scores and snippets for ranked rows;
+        fields="snippet" leaves out the full content
+        """
+        _, articles = self._get_kb_cache()
+        best_passage = best_passage or {}
+        results = []
+        for row, score in hits:
+            article = articles[row]
+            if article is None:
+                continue
+            results.append({
+                "id": article['id'],
+                "title": article['title'],
+                "content": article['content'],
+                "snippet": self._snippet(row, best_passage.get(row, 0)),
+                "category": article['category'],
+                "relevance_score": round(score, 4)
+            })
+        return select_fields(results, fields, settings.SNIPPET_MAX_CHARS)
+    
+    def search(
+        self,
+        query: str,
+        limit: int = 3,
+        mode: str = "semantic",
+        category: Optional[str] = None,
+        fields: str = "full"
+    ) -> List[Dict]:
+        """
+        Search knowledge base using semantic similarity ("semantic"), BM25
+        ("lexical") or both fused with reciprocal rank fusion ("hybrid"),
+        optionally only within one category
+        Returns articles sorted by relevance, each with a snippet; with
+        fields="snippet" the full content is left out
         """
         try:
-            # Generate query embedding
-            query_embedding = self.model.encode(query)
-            
-            # Get KB articles with embeddings
-            kb_articles = self._get_kb_cache()
+            if self.uses_database():
+                query_embedding = None if mode == "lexical" else self.encode_queries([query])[0]
+                results = self._search_database(query, query_embedding, limit, mode, category)
+                logger.info(f"Found {len(results)} relevant articles for query: {query[:50]}...")
+                return select_fields(results, fields, settings.SNIPPET_MAX_CHARS)
             
-            if not kb_articles:
+            index, _ = self._get_kb_cache()
+            if len(index) == 0:
                 logger.warning("No KB articles with embeddings found")
                 return []
             
-            # Calculate cosine similarity
-            similarities = []
-            for article in kb_articles:
-                if article.get('embedding') is not None:
-                    # Cosine similarity
-                    similarity = np.dot(query_embedding, article['embedding']) / (
-                        np.linalg.norm(query_embedding) * np.linalg.norm(article['embedding'])
+            if mode == "lexical":
+                with self._kb_lock:
+                    results = self._format_results(self._rank_lexical(query, limit, category), fields=fields)
+            else:
+                # Generate query embedding
+                query_embedding = self.encode_queries([query])
+                with self._kb_lock:
+                    if mode == "hybrid":
+                        hits, best_passage = self._rank_hybrid(query, query_embedding, limit, category)
+                    else:
+                        hits, best_passage = self._rank(query_embedding, limit, category=category)[0]
+                    results = self._format_results(hits, best_passage, fields)
+            
+            logger.info(f"Found {len(results)} relevant articles for query: {query[:50]}...")
+            return results
+        
+        except Exception as e:
+            logger.error(f"Semantic search error: {e}")
+            # Fallback to keyword search
+            return select_fields(
+                KnowledgeBaseModel.search_by_keywords(query, limit, category), fields, settings.SNIPPET_MAX_CHARS
+            )
+    
+    def search_batch(self, queries: List[str], limit: int = 3, fields: str = "full") -> List[List[Dict]]:
+        """
+        Search for many queries at once: one batched encode call and one
+        scoring pass against the KB. Results are in query order.
+        """
+        try:
+            if self.uses_database():
+                query_embeddings = self.encode_queries(queries)
+                return [
+                    select_fields(
+                        self._search_database(query, vector, limit, "semantic"), fields, settings.SNIPPET_MAX_CHARS
                     )
-                    similarities.append((article, float(similarity)))
+                    for query, vector in zip(queries, query_embeddings)
+                ]
             
-            # Sort by similarity (descending)
-            similarities.sort(key=lambda x: x[1], reverse=True)
+            index, _ = self._get_kb_cache()
+            if len(index) == 0:
+                logger.warning("No KB articles with embeddings found")
+                return [[] for _ in queries]
             
-            # Return top results with relevance scores
-            results = []
-            for article, score in similarities[:limit]:
-                result = {
-                    "id": article['id'],
-                    "title": article['title'],
-                    "content": article['content'],
-                    "category": article['category'],
-                    "relevance_score": round(score, 3)
-                }
-                results.append(result)
+            query_embeddings = self.encode_queries(queries)
+            results = self.search_by_vectors(query_embeddings, limit, fields=fields)
             
-            logger.info(f"Found {len(results)} relevant articles for query: {query[:50]}...")
+            logger.info(f"Batch searched {len(queries)} queries")
             return results
         
         except Exception as e:
-            logger.error(f"Semantic search error: {e}")
+            logger.error(f"Semantic batch search error: {e}")
             # Fallback to keyword search
-            return KnowledgeBaseModel.search_by_keywords(query, limit)
+            return [
+                select_fields(KnowledgeBaseModel.search_by_keywords(query, limit), fields, settings.SNIPPET_MAX_CHARS)
+                for query in queries
+            ]
+    
+    def search_by_vectors(
+        self,
+        query_vectors: np.ndarray,
+        limit: int = 3,
+        exact: bool = False,
+        fields: str = "full"
+    ) -> List[List[Dict]]:
+        """Search for a batch of normalized query vectors"""
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        with self._kb_lock:
+            return [
+                self._format_results(hits, best_passage, fields)
+                for hits, best_passage in self._rank(query_vectors, limit, exact)
+            ]
     
     def refresh_cache(self):
         """Refresh the KB embeddings cache"""
         logger.info("Refreshing KB cache...")
-        self._kb_cache = None
-        self._get_kb_cache()
+        # Re-decide memory vs database: the KB may have grown past the threshold
+        self._use_database = None
+        if self.uses_database():
+            with self._kb_lock:
+                self._kb_cache = None
+            return
+        # Build the new cache before swapping it in, so searches never see it empty
+        self._set_kb_cache(self._load_kb_embeddings())
+    
+    def refresh_incremental(self) -> Dict[str, int]:
+        """
+        Patch articles changed since the last watermark into the cached index
+        (and drop deleted ones) instead of reloading the whole table.
+        Does nothing until the cache has been loaded by a first search.
+        """
+        if self._kb_cache is None:
+            return {"updated": 0, "added": 0, "removed": 0}
+        
+        since = self._watermark - WATERMARK_OVERLAP if self._watermark else None
+        rows = KnowledgeBaseModel.get_updated_since(since)
+        live_ids = set(KnowledgeBaseModel.get_embedded_ids())
+        
+        with self._kb_lock:
+            index, articles = self._kb_cache
+            changed_rows, changed_vectors, updated, added = [], [], 0, 0
+            
+            for article in rows:
+                vector = to_vector(article.pop('embedding', None))
+                article_id = str(article['id'])
+                row = self._row_of_id.get(article_id)
+                if vector is None or article_id not in live_ids:
+                    continue
+                if row is not None and articles[row] is not None and \
+                        _as_datetime(articles[row].get('updated_at')) == _as_datetime(article.get('updated_at')):
+                    continue  # already patched (overlap window)
+                if row is None:
+                    row = len(articles)
+                    articles.append(None)
+                    self._row_of_id[article_id] = row
+                    added += 1
+                else:
+                    updated += 1
+                articles[row] = article
+                changed_rows.append(row)
+                changed_vectors.append(vector)
+            
+            removed_rows = [row for article_id, row in self._row_of_id.items() if article_id not in live_ids]
+            for row in removed_rows:
+                del self._row_of_id[str(articles[row]['id'])]
+                articles[row] = None
+                self._bm25.remove(row)
+            for row in changed_rows:
+                self._bm25.add(row, article_tokens(articles[row]))
+            
+            stride = self._passage_stride
+            if changed_rows or removed_rows:
+                stale_rows = np.array(changed_rows + removed_rows, dtype=np.int64)
+                stale = (stale_rows[:, None] * stride + np.arange(stride)).reshape(-1)
+                index.remove(stale)
+                for partition in self._category_indexes.values():
+                    partition.remove(stale)
+                for row in stale_rows.tolist():
+                    self._passages.pop(row, None)
+            if changed_rows:
+                matrix = normalize_rows(np.asarray(changed_vectors, dtype=np.float32).reshape(len(changed_rows), -1))
+                keys, matrix, passages = self._passage_vectors(
+                    changed_rows, [articles[row] for row in changed_rows], matrix
+                )
+                self._passages.update(passages)
+                index.add(keys, matrix)
+                categories = np.array(
+                    [articles[row].get('category') or 'other' for row in (keys // stride).tolist()], dtype=object
+                )
+                for category in set(categories.tolist()):
+                    if category not in self._category_indexes and isinstance(index, IVFIndex):
+                        self._category_indexes[category] = IVFSubset(index)
+                    elif category not in self._category_indexes:
+                        self._category_indexes[category] = ExactIndex(
+                            matrix.shape[1], settings.SEARCH_VECTOR_DTYPE, getattr(index, 'rescore_source', None)
+                        )
+                    in_category = categories == category
+                    self._category_indexes[category].add(keys[in_category], matrix[in_category])
+            
+            timestamps = [t for t in (_as_datetime(a.get('updated_at')) for a in rows) if t is not None]
+            if timestamps:
+                self._watermark = max([self._watermark or timestamps[0]] + timestamps)
+            self._cache_timestamp = datetime.now()
+        
+        stats = {"updated": updated, "added": added, "removed": len(removed_rows)}
+        if any(stats.values()):
+            logger.info(f"Incremental KB refresh: {stats}")
+        return stats
+
+    def reembed_stale(self, limit: int = 64) -> int:
+        """
+        Re-embed up to `limit` articles whose embedding is missing or stale
+        (title/content hash or EMBEDDING_MODEL_ID changed), the same way
+        scripts/04-generate-embeddings.py does. The updated rows are picked
+        up by the next incremental refresh. Returns the number re-embedded.
+        """
+        rows = KnowledgeBaseModel.get_stale_embeddings(settings.EMBEDDING_MODEL_ID, limit)
+        if not rows:
+            return 0
+        texts = [f"{row['title']}\n\n{row['content']}" for row in rows]
+        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        for row, embedding in zip(rows, embeddings):
+            row['embedding'] = embedding.tolist()
+        updated = KnowledgeBaseModel.update_embeddings(rows, settings.EMBEDDING_MODEL_ID)
+        logger.info(f"Re-embedded {updated} stale KB articles")
+        return updated
+
+def _warm_up_search_engine(engine: SemanticSearchEngine):
+    """Dummy encode so the first real query doesn't pay for buffer allocation"""
+    engine.model.encode(["Warm-up: how do I reset my password?"])
 
-# Global search engine instance
-_search_engine = None
+# Search engine instance is owned by the model registry (lazy, may be unloaded when idle)
+get_model_registry().register(
+    "search_engine",
+    SemanticSearchEngine,
+    size_mb=settings.SEARCH_MODEL_SIZE_MB,
+    warmup=_warm_up_search_engine
+)
 
 def get_search_engine() -> SemanticSearchEngine:
-    """Get or create search engine instance (singleton pattern)"""
-    global _search_engine
-    if _search_engine is None:
-        _search_engine = SemanticSearchEngine()
-    return _search_engine
+    """Get search engine instance, loading it on first use"""
+    return get_model_registry().get("search_engine")
+
+def start_kb_auto_refresh(interval_seconds: float = None) -> Optional[threading.Thread]:
+    """
+    Poll for changed KB articles every KB_REFRESH_INTERVAL_SECONDS from a
+    daemon thread. Only a loaded engine is refreshed; an unloaded one will
+    read the whole table when it is next loaded anyway. With
+    KB_REEMBED_BATCH_SIZE, each poll first re-embeds that many edited articles.
+    """
+    interval_seconds = settings.KB_REFRESH_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+    if interval_seconds <= 0:
+        return None
+    
+    def poll():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                if get_model_registry().is_loaded("search_engine"):
+                    engine = get_search_engine()
+                    if settings.KB_REEMBED_BATCH_SIZE > 0:
+                        engine.reembed_stale(settings.KB_REEMBED_BATCH_SIZE)
+                    engine.refresh_incremental()
+            except Exception as e:
+                logger.warning(f"Incremental KB refresh failed: {e}")
+    
+    thread = threading.Thread(target=poll, name="kb-auto-refresh", daemon=True)
+    thread.start()
+    return thread
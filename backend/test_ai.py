@@ -3,6 +3,7 @@ Test script for AI classification and semantic search
 """
 
 import asyncio
+import time
 from ai_classifier import get_classifier
 from semantic_search import get_search_engine
 
@@ -32,6 +33,44 @@ def test_classifier():
         if result['auto_resolve']:
             print(f"Resolution: {result['resolution_message'][:100]}...")
 
+def test_batch_classifier():
+    """Test batched classification matches single-text classification"""
+    print("\n" + "="*60)
+    print("Testing Batch Classification")
+    print("="*60)
+    
+    classifier = get_classifier()
+    
+    texts = [
+        "VPN keeps disconnecting every few minutes.",
+        "Please grant me access to the finance shared folder.",
+        "Printer on floor 3 is jammed again.",
+        "Outlook crashes when opening attachments.",
+    ] * 4
+    
+    start = time.perf_counter()
+    single_results = [classifier.classify(text) for text in texts]
+    single_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batch_results = classifier.classify_batch(texts)
+    batch_time = time.perf_counter() - start
+    
+    mismatches = sum(
+        1 for single, batch in zip(single_results, batch_results)
+        if single['category'] != batch['category']
+    )
+    
+    print(f"Texts: {len(texts)}")
+    print(f"Sequential: {single_time:.2f}s, Batched: {batch_time:.2f}s")
+    print(f"Speedup: {single_time / batch_time:.1f}x")
+    print(f"Category mismatches: {mismatches}")
+    
+    # One result per text, in input order, agreeing with single-text classification
+    assert len(batch_results) == len(texts)
+    assert mismatches == 0
+    assert [r['priority'] for r in batch_results] == [r['priority'] for r in single_results]
+
 def test_semantic_search():
     """Test semantic search"""
     print("\n" + "="*60)
@@ -57,11 +96,53 @@ def test_semantic_search():
         else:
             print("  No results found")
 
+def test_batch_search():
+    """Test batched KB search matches one-at-a-time search"""
+    print("\n" + "="*60)
+    print("Testing Batch Semantic Search")
+    print("="*60)
+    
+    search_engine = get_search_engine()
+    
+    queries = [
+        "How do I reset my password?",
+        "VPN not connecting",
+        "Setup email on iPhone",
+        "Request new laptop",
+    ] * 4
+    
+    start = time.perf_counter()
+    single_results = [search_engine.search(query, limit=3) for query in queries]
+    single_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batch_results = search_engine.search_batch(queries, limit=3)
+    batch_time = time.perf_counter() - start
+    
+    mismatches = sum(
+        1 for single, batch in zip(single_results, batch_results)
+        if [a['id'] for a in single] != [a['id'] for a in batch]
+    )
+    
+    print(f"Queries: {len(queries)}")
+    print(f"Sequential: {single_time:.2f}s, Batched: {batch_time:.2f}s")
+    print(f"Result mismatches: {mismatches}")
+    
+    # One ranked list per query, in query order, each within the limit
+    assert len(batch_results) == len(queries)
+    assert all(len(results) <= 3 for results in batch_results)
+    assert mismatches == 0
+    for results in batch_results:
+        scores = [article['relevance_score'] for article in results]
+        assert scores == sorted(scores, reverse=True)
+
 if __name__ == "__main__":
     print("POWERGRID AI Ticketing System - AI Component Tests")
     
     test_classifier()
+    test_batch_classifier()
     test_semantic_search()
+    test_batch_search()
     
     print("\n" + "="*60)
     print("Tests completed!")
@@ -0,0 +1,69 @@
+"""
+Test script for the async connection pool and named statements
+(needs the database from DATABASE_URL)
+"""
+
+import asyncio
+
+from async_database import close_async_pool, get_async_connection, get_unit_of_work, init_async_pool
+from async_models import AsyncKnowledgeBaseModel, AsyncTicketModel
+
+async def test_named_statements_across_checkouts():
+    """Named statements keep working after the pooled connection was released and re-acquired"""
+    print("\n" + "="*60)
+    print("Testing named statements across pool checkouts")
+    print("="*60)
+
+    # A single connection, so every checkout reuses it
+    pool = await init_async_pool(min_size=1, max_size=1)
+    try:
+        first_pid = None
+        for checkout in range(3):
+            async with get_async_connection() as conn:
+                pid = conn.get_server_pid()
+                first_pid = first_pid or pid
+                assert pid == first_pid
+            tickets = await AsyncTicketModel.list_tickets(limit=5)
+            assert len(tickets) <= 5
+            articles = await AsyncKnowledgeBaseModel.search_by_keywords("password", limit=3)
+            assert len(articles) <= 3
+            print(f"[Checkout {checkout + 1}] {len(tickets)} tickets, {len(articles)} articles")
+        assert pool.get_size() == 1
+    finally:
+        await close_async_pool()
+
+async def test_unit_of_work_rollback():
+    """A failed request rolls back the ticket it created"""
+    print("\n" + "="*60)
+    print("Testing unit of work rollback")
+    print("="*60)
+
+    await init_async_pool(min_size=1, max_size=1)
+    try:
+        dependency = get_unit_of_work()
+        uow = await dependency.__anext__()
+        ticket = await AsyncTicketModel.create(
+            "test", "uow-test@powergrid.in", "Rollback test", "Should not persist",
+            "low", "other", uow=uow
+        )
+        try:
+            await dependency.athrow(RuntimeError("request failed"))
+        except RuntimeError:
+            pass
+        assert await AsyncTicketModel.get_by_id(ticket['id']) is None
+        print(f"Ticket {str(ticket['id'])[:8]} rolled back")
+    finally:
+        await close_async_pool()
+
+async def main():
+    await test_named_statements_across_checkouts()
+    await test_unit_of_work_rollback()
+
+if __name__ == "__main__":
+    print("POWERGRID AI Ticketing System - Async Database Tests")
+
+    asyncio.run(main())
+
+    print("\n" + "="*60)
+    print("Tests completed!")
+    print("="*60)
@@ -0,0 +1,92 @@
+"""
+Test script for the BM25 index and reciprocal rank fusion (no model or database needed)
+"""
+
+from bm25_index import BM25Index, article_tokens, reciprocal_rank_fusion, tokenize
+
+ARTICLES = [
+    {"title": "VPN connection error 809", "content": "Open UDP ports 500 and 4500 on the home router.", "keywords": ["vpn"]},
+    {"title": "Reset your password", "content": "Use the self-service portal to reset an expired password.", "keywords": ["password"]},
+    {"title": "Printer offline", "content": "Check the network cable and restart the printer.", "keywords": ["printer"]},
+    {"title": "Outlook error 0x80070005", "content": "Repair the Office installation from Control Panel.", "keywords": ["outlook", "email"]},
+]
+
+def test_tokenize():
+    """Tokens are lowercased, keep error codes and drop stopwords"""
+    print("\n" + "="*60)
+    print("Testing BM25 tokenization")
+    print("="*60)
+
+    assert tokenize("How do I fix Error 0x80070005 in the VPN?") == ["fix", "error", "0x80070005", "vpn"]
+    tokens = article_tokens({"title": "VPN", "content": "router", "keywords": ["remote"]})
+    assert tokens.count("vpn") == 2 and tokens.count("router") == 1 and tokens.count("remote") == 2
+    print("ok")
+
+def test_search():
+    """Exact terms rank their article first; unmatched queries return nothing"""
+    print("\n" + "="*60)
+    print("Testing BM25 search")
+    print("="*60)
+
+    index = BM25Index.from_articles(ARTICLES)
+    assert len(index) == 4
+
+    results = index.search("error 0x80070005", 3)
+    assert [key for key, _ in results][:1] == [3]
+    assert len(results) == 2  # "error" also matches the VPN article
+    assert results[0][1] > results[1][1] > 0
+
+    assert [key for key, _ in index.search("password expired", 5)] == [1]
+    assert index.search("bluetooth headset", 5) == []
+    assert index.search("error", 0) == []
+
+    results = index.search("error", 5, allowed={0})
+    assert [key for key, _ in results] == [0]
+    print("ok")
+
+def test_add_remove():
+    """Removed documents stop matching; re-adding a key replaces the document"""
+    print("\n" + "="*60)
+    print("Testing BM25 add/remove")
+    print("="*60)
+
+    index = BM25Index.from_articles([ARTICLES[0], None, ARTICLES[2]])
+    assert len(index) == 2
+
+    index.remove(0)
+    assert index.search("vpn", 5) == []
+    index.remove(0)  # unknown keys are ignored
+
+    index.add(2, article_tokens(ARTICLES[1]))
+    assert len(index) == 1
+    assert index.search("printer", 5) == []
+    assert [key for key, _ in index.search("password", 5)] == [2]
+    print("ok")
+
+def test_reciprocal_rank_fusion():
+    """Keys ranked well in both lists win; raw scores are ignored"""
+    print("\n" + "="*60)
+    print("Testing reciprocal rank fusion")
+    print("="*60)
+
+    vector_hits = [("a", 0.91), ("b", 0.90), ("c", 0.10)]
+    lexical_hits = [("b", 42.0), ("d", 30.0), ("a", 1.0)]
+    fused = reciprocal_rank_fusion([vector_hits, lexical_hits], limit=3, k=60)
+
+    assert [key for key, _ in fused] == ["b", "a", "d"]
+    assert abs(fused[0][1] - (1 / 62 + 1 / 61)) < 1e-12
+    assert len(reciprocal_rank_fusion([vector_hits, lexical_hits], limit=10)) == 4
+    assert reciprocal_rank_fusion([[], []], limit=3) == []
+    print("ok")
+
+if __name__ == "__main__":
+    print("POWERGRID AI Ticketing System - BM25 Tests")
+
+    test_tokenize()
+    test_search()
+    test_add_remove()
+    test_reciprocal_rank_fusion()
+
+    print("\n" + "="*60)
+    print("Tests completed!")
+    print("="*60)
@@ -0,0 +1,63 @@
+"""
+Test script for the /chatbot endpoint through the full app
+(needs the database from DATABASE_URL and the AI models)
+"""
+
+from uuid import UUID
+
+from fastapi.testclient import TestClient
+
+from database import get_db_cursor
+from main import app
+
+EMPLOYEE = "chatbot-test@powergrid.in"
+
+def test_chatbot_creates_ticket(client: TestClient):
+    """An IT issue that can't be auto-resolved creates a ticket, referenced by its short ID"""
+    print("\n" + "="*60)
+    print("Testing /chatbot ticket creation")
+    print("="*60)
+
+    response = client.post("/chatbot", json={
+        "message": "My laptop screen is cracked and flickering, I need it repaired",
+        "employee": EMPLOYEE
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["ticket_created"] is True and body["auto_resolved"] is False
+    ticket_id = body["ticket_id"]
+    assert f"#{ticket_id[:8]}" in body["response"]
+    assert all("content" not in article or article["content"] is None for article in body["kb_suggestions"])
+
+    ticket = client.get(f"/tickets/{ticket_id}").json()
+    assert ticket["source"] == "chatbot" and ticket["employee"] == EMPLOYEE
+    print(f"Created ticket #{ticket_id[:8]} ({ticket['category']}, {ticket['priority']})")
+    return UUID(ticket_id)
+
+def test_chatbot_small_talk(client: TestClient):
+    """Greetings are answered without a ticket"""
+    print("\n" + "="*60)
+    print("Testing /chatbot small talk")
+    print("="*60)
+
+    response = client.post("/chatbot", json={"message": "Hello!", "employee": EMPLOYEE})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["ticket_created"] is False and body["ticket_id"] is None
+    print(f"Response: {body['response'][:80]}")
+
+if __name__ == "__main__":
+    print("POWERGRID AI Ticketing System - Chatbot Tests")
+
+    # Entering the client runs the app lifespan (pools, models)
+    with TestClient(app) as client:
+        ticket_id = test_chatbot_creates_ticket(client)
+        test_chatbot_small_talk(client)
+
+        # Clean up while the pools are still open
+        with get_db_cursor() as cursor:
+            cursor.execute("DELETE FROM tickets WHERE id = %s", (str(ticket_id),))
+
+    print("\n" + "="*60)
+    print("Tests completed!")
+    print("="*60)
@@ -0,0 +1,130 @@
+"""
+Test script for the memory-mapped KB embedding store (no model or database needed)
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from embedding_store import CURRENT_FILE, EmbeddingStore
+
+DIM = 8
+
+def _articles(ids, category="network"):
+    return [
+        {"id": f"kb-{i}", "title": f"Article {i}", "content": f"Content {i}", "category": category,
+         "keywords": ["kb"], "updated_at": "2024-01-01T00:00:00", "views": 5}
+        for i in ids
+    ]
+
+def _vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32) * 3
+
+def test_write_and_load():
+    """A written store loads as a normalized read-only memory map, grouped by category"""
+    print("\n" + "="*60)
+    print("Testing embedding store write/load")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = EmbeddingStore(path)
+        assert not store.exists()
+
+        articles = _articles([0, 1], "software") + _articles([2], "access")
+        vectors = _vectors(3)
+        store.write(articles, vectors)
+
+        matrix, loaded = store.load()
+        assert isinstance(matrix, np.memmap) and not matrix.flags.writeable
+        assert matrix.shape == (3, DIM)
+        assert [a["id"] for a in loaded] == ["kb-2", "kb-0", "kb-1"]
+        assert [a["category"] for a in loaded] == ["access", "software", "software"]
+        assert "views" not in loaded[0]
+        assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0, atol=1e-5)
+        assert np.allclose(matrix[0], vectors[2] / np.linalg.norm(vectors[2]), atol=1e-6)
+        assert store.manifest()["version"] == 1
+        print("ok")
+
+def test_append_publishes_new_version():
+    """Appends are invisible to an existing map and visible after reload"""
+    print("\n" + "="*60)
+    print("Testing embedding store append/reload")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = EmbeddingStore(path)
+        store.write(_articles([0, 1]), _vectors(2))
+        old_matrix, _ = store.load()
+
+        store.append(_articles([2]), _vectors(1, seed=1))
+        assert old_matrix.shape == (2, DIM)
+
+        matrix, articles = store.load()
+        assert matrix.shape == (3, DIM)
+        assert [a["id"] for a in articles] == ["kb-0", "kb-1", "kb-2"]
+        assert np.allclose(matrix[:2], old_matrix)
+        assert store.manifest()["version"] == 2
+
+        try:
+            store.append(_articles([3]), np.ones((1, DIM + 1), dtype=np.float32))
+            raise AssertionError("dimension mismatch was accepted")
+        except ValueError:
+            pass
+        print("ok")
+
+def test_append_keeps_category_grouping():
+    """Appends into the last category extend the data file; others rewrite the store grouped"""
+    print("\n" + "="*60)
+    print("Testing embedding store category grouping")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = EmbeddingStore(path)
+        store.write(_articles([0], "access") + _articles([1], "network"), _vectors(2))
+
+        store.append(_articles([2], "network"), _vectors(1, seed=1))
+        assert store.manifest()["data_file"] == "vectors-000001.f32"
+
+        store.append(_articles([3], "hardware"), _vectors(1, seed=2))
+        manifest = store.manifest()
+        assert manifest["data_file"] == "vectors-000003.f32"
+        matrix, articles = store.load()
+        assert isinstance(matrix, np.memmap) and matrix.shape == (4, DIM)
+        assert [a["category"] for a in articles] == ["access", "hardware", "network", "network"]
+        assert [a["id"] for a in articles] == ["kb-0", "kb-3", "kb-1", "kb-2"]
+        assert np.allclose(matrix[1], _vectors(1, seed=2)[0] / np.linalg.norm(_vectors(1, seed=2)[0]), atol=1e-6)
+        print("ok")
+
+def test_rewrite_removes_stale_files():
+    """A full rewrite switches CURRENT to a new data file and deletes the old one"""
+    print("\n" + "="*60)
+    print("Testing embedding store rewrite")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as path:
+        store = EmbeddingStore(path)
+        store.write(_articles([0, 1]), _vectors(2))
+        store.write(_articles([5]), _vectors(1, seed=2))
+
+        files = sorted(os.listdir(path))
+        assert files == [CURRENT_FILE, "manifest-000002.json", "vectors-000002.f32"], files
+        matrix, articles = store.load()
+        assert matrix.shape == (1, DIM) and articles[0]["id"] == "kb-5"
+
+        store.write([], np.zeros((0, DIM), dtype=np.float32))
+        matrix, articles = store.load()
+        assert matrix.shape == (0, DIM) and articles == []
+        print("ok")
+
+if __name__ == "__main__":
+    print("POWERGRID AI Ticketing System - Embedding Store Tests")
+
+    test_write_and_load()
+    test_append_publishes_new_version()
+    test_append_keeps_category_grouping()
+    test_rewrite_removes_stale_files()
+
+    print("\n" + "="*60)
+    print("Tests completed!")
+    print("="*60)
@@ -0,0 +1,97 @@
+"""
+Test script for token budgeting, chunking and KB snippets (no model or database needed)
+"""
+
+from text_budget import chunk_text, fit_to_budget, make_snippet, select_fields
+
+class WhitespaceTokenizer:
+    """One token per word, called like a Hugging Face tokenizer"""
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+TOKENIZER = WhitespaceTokenizer()
+
+LONG_TEXT = (
+    "VPN disconnects every few minutes since Monday. "
+    "I already restarted my laptop twice. "
+    "The client shows error 809 when it drops. "
+    "My manager needs the quarterly report by Friday. "
+    "Regards and thanks for your help."
+)
+
+def test_make_snippet():
+    """Snippets keep short text, cut long text at a word boundary and collapse whitespace"""
+    print("\n" + "="*60)
+    print("Testing make_snippet")
+    print("="*60)
+
+    assert make_snippet("Short  text\nhere", 50) == "Short text here"
+    snippet = make_snippet("Restart the router, then check the cables again", 20)
+    assert snippet == "Restart the router..."
+    assert len(snippet) <= 20 + 3
+    assert make_snippet("Supercalifragilistic", 5) == "Super..."
+    assert make_snippet("", 10) == ""
+    print("ok")
+
+def test_select_fields():
+    """Every result gets a snippet; fields=snippet drops the full content"""
+    print("\n" + "="*60)
+    print("Testing select_fields")
+    print("="*60)
+
+    full = select_fields([{"content": "Open ports 500 and 4500 on the router."}], "full", 12)
+    assert full == [{"content": "Open ports 500 and 4500 on the router.", "snippet": "Open ports..."}]
+
+    articles = [{"content": "Whole article", "snippet": "matched passage"}, {"content": None}]
+    trimmed = select_fields(articles, "snippet", 100)
+    assert trimmed == [{"snippet": "matched passage"}, {"snippet": ""}]
+    print("ok")
+
+def test_fit_to_budget():
+    """Short text is unchanged; long text keeps the subject and fits the budget"""
+    print("\n" + "="*60)
+    print("Testing fit_to_budget")
+    print("="*60)
+
+    assert fit_to_budget("VPN down", TOKENIZER, 64) == "VPN down"
+
+    fitted = fit_to_budget(LONG_TEXT, TOKENIZER, 20, subject="VPN keeps dropping")
+    assert fitted.startswith("VPN keeps dropping\n")
+    assert len(fitted.split()) <= 20
+    assert "error 809" in fitted
+    print(f"Fitted: {fitted!r}")
+
+def test_chunk_text():
+    """Chunks are consecutive whole sentences within budget, capped at max_chunks"""
+    print("\n" + "="*60)
+    print("Testing chunk_text")
+    print("="*60)
+
+    assert chunk_text("Printer offline", TOKENIZER, 64, 4) == ["Printer offline"]
+
+    chunks = chunk_text(LONG_TEXT, TOKENIZER, 16, 8, subject="")
+    assert len(chunks) > 1
+    assert all(len(chunk.split()) <= 16 for chunk in chunks)
+    assert " ".join(chunks) == " ".join(LONG_TEXT.split())
+
+    capped = chunk_text(LONG_TEXT, TOKENIZER, 16, 2, subject="")
+    assert len(capped) == 2
+    assert all(chunk in chunks for chunk in capped)
+    assert chunks.index(capped[0]) < chunks.index(capped[1])
+
+    with_subject = chunk_text(LONG_TEXT, TOKENIZER, 20, 8, subject="VPN issue")
+    assert all(chunk.startswith("VPN issue\n") for chunk in with_subject)
+    print(f"{len(chunks)} chunks, capped to {len(capped)}")
+
+if __name__ == "__main__":
+    print("POWERGRID AI Ticketing System - Text Budget Tests")
+
+    test_make_snippet()
+    test_select_fields()
+    test_fit_to_budget()
+    test_chunk_text()
+
+    print("\n" + "="*60)
+    print("Tests completed!")
+    print("="*60)
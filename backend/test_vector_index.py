@@ -0,0 +1,166 @@
+"""
+Test script for the KB vector indexes (NumPy only, no model or database needed)
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from vector_index import ExactIndex, IVFIndex, IVFSubset, load_index, measure_recall
+
+DIM = 32
+
+def _unit_vectors(n: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _brute_force(vectors: np.ndarray, keys: np.ndarray, query: np.ndarray, k: int) -> list:
+    return keys[np.argsort(-(vectors @ query), kind="stable")[:k]].tolist()
+
+def test_exact_search():
+    """Exact index returns the brute-force top-k, best first, padded when short"""
+    print("\n" + "="*60)
+    print("Testing ExactIndex search")
+    print("="*60)
+
+    vectors = _unit_vectors(500)
+    keys = np.arange(500) * 10
+    index = ExactIndex.from_arrays(keys, vectors)
+
+    assert len(index) == 500
+    scores, found = index.search(vectors[:3], 5)
+    assert scores.shape == found.shape == (3, 5)
+    for q in range(3):
+        assert found[q].tolist() == _brute_force(vectors, keys, vectors[q], 5)
+        assert found[q, 0] == keys[q]
+        assert np.all(np.diff(scores[q]) <= 0)
+
+    small = ExactIndex.from_arrays(keys[:2], vectors[:2])
+    scores, found = small.search(vectors[0], 4)
+    assert found[0].tolist()[2:] == [-1, -1]
+    assert np.isneginf(scores[0, 2:]).all()
+    print("ok")
+
+def test_add_remove():
+    """Incremental adds and removes are reflected in search results"""
+    print("\n" + "="*60)
+    print("Testing add/remove")
+    print("="*60)
+
+    vectors = _unit_vectors(300, seed=1)
+    for index in (ExactIndex(DIM), IVFIndex(DIM, nlist=4, min_points_per_list=10)):
+        index.add(np.arange(200), vectors[:200])
+        index.add(np.arange(200, 300), vectors[200:])
+        assert len(index) == 300
+
+        _, found = index.search(vectors[250], 1, **({"nprobe": 4} if isinstance(index, IVFIndex) else {}))
+        assert found[0, 0] == 250
+
+        index.remove(np.array([250, 251]))
+        assert len(index) == 298
+        _, found = index.search(vectors[250], 10, **({"nprobe": 4} if isinstance(index, IVFIndex) else {}))
+        assert 250 not in found[0].tolist() and 251 not in found[0].tolist()
+        print(f"{type(index).__name__}: ok")
+
+def test_ivf():
+    """IVF trains on enough vectors, is exact with nprobe == nlist and survives save/load"""
+    print("\n" + "="*60)
+    print("Testing IVFIndex")
+    print("="*60)
+
+    vectors = _unit_vectors(2000, seed=2)
+    keys = np.arange(2000)
+    queries = _unit_vectors(20, seed=3)
+    exact = ExactIndex.from_arrays(keys, vectors)
+
+    ivf = IVFIndex(DIM, nlist=16, nprobe=4)
+    ivf.train(vectors)
+    ivf.add(keys, vectors)
+    assert ivf.is_trained and len(ivf) == 2000
+
+    # Probing more lists never loses recall; probing all of them is exact
+    recall = measure_recall(ivf, exact, queries, k=10)
+    ivf.nprobe = 8
+    assert 0 < recall <= measure_recall(ivf, exact, queries, k=10)
+    ivf.nprobe = 4
+    _, full = ivf.search(queries, 10, nprobe=16)
+    _, truth = exact.search(queries, 10)
+    assert (full == truth).all()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Saved under exactly the given name (np.savez alone would append ".npz")
+        path = os.path.join(tmp, "kb-index")
+        ivf.fingerprint = "abc"
+        ivf.save(path)
+        assert os.listdir(tmp) == ["kb-index"]
+        loaded = load_index(path)
+    assert isinstance(loaded, IVFIndex) and loaded.fingerprint == "abc"
+    assert (loaded.search(queries, 10, nprobe=16)[1] == truth).all()
+    print(f"recall@10 at nprobe=4: {measure_recall(ivf, exact, queries, k=10):.2f}")
+
+def test_quantized():
+    """float16/int8 storage shrinks memory and keeps the top hit; rescoring restores exact order"""
+    print("\n" + "="*60)
+    print("Testing quantized storage")
+    print("="*60)
+
+    vectors = _unit_vectors(1000, seed=4)
+    keys = np.arange(1000)
+    exact = ExactIndex.from_arrays(keys, vectors)
+    _, truth = exact.search(vectors[:10], 5)
+
+    for dtype, ratio in (("float16", 2), ("int8", 4)):
+        index = ExactIndex.from_arrays(keys, vectors, dtype)
+        # int8 also keeps one float32 scale per row
+        assert index.nbytes <= exact.nbytes / ratio + 4 * len(keys)
+        _, found = index.search(vectors[:10], 5)
+        assert (found[:, 0] == truth[:, 0]).all()
+
+        rescored = ExactIndex.from_arrays(keys, vectors, dtype, rescore_source=vectors)
+        _, found = rescored.search(vectors[:10], 5)
+        assert (found == truth).all()
+        print(f"{dtype}: {index.nbytes} bytes vs {exact.nbytes}")
+
+def test_slice_and_subset():
+    """Category slices and IVF subsets only return their own keys"""
+    print("\n" + "="*60)
+    print("Testing slices and IVF subsets")
+    print("="*60)
+
+    vectors = _unit_vectors(1000, seed=5)
+    keys = np.arange(1000)
+    index = ExactIndex.from_arrays(keys, vectors)
+    part = index.slice(200, 400)
+    assert len(part) == 200
+    _, found = part.search(vectors[:5], 10)
+    assert ((found >= 200) & (found < 400)).all()
+    assert found[:, 0].tolist() == [
+        _brute_force(vectors[200:400], keys[200:400], query, 1)[0] for query in vectors[:5]
+    ]
+
+    ivf = IVFIndex(DIM, nlist=8)
+    ivf.train(vectors)
+    ivf.add(keys, vectors)
+    subset = IVFSubset(ivf, keys[200:400])
+    _, found_subset = subset.search(vectors[:5], 10, nprobe=8)
+    assert (found_subset == found).all()
+
+    subset.remove(np.array([found[0, 0]]))
+    _, found_subset = subset.search(vectors[0], 10, nprobe=8)
+    assert found[0, 0] not in found_subset[0].tolist()
+    assert len(subset) == 199
+    print("ok")
+
+if __name__ == "__main__":
+    print("POWERGRID AI Ticketing System - Vector Index Tests")
+
+    test_exact_search()
+    test_add_remove()
+    test_ivf()
+    test_quantized()
+    test_slice_and_subset()
+
+    print("\n" + "="*60)
+    print("Tests completed!")
+    print("="*60)
@@ -0,0 +1,193 @@
+"""
+Token budgeting for long ticket texts.
+
+Long email / SolMan bodies (plus the conversation history added by the
+chatbot) would otherwise be silently truncated by the models, or cost
+quadratic attention time. These helpers keep the subject line and the most
+informative sentences within a token budget, or split the text into a bounded
+number of budget-sized chunks for chunked inference with score pooling.
+The same chunking splits long KB articles into passages, and KB search
+results are cut down to short snippets here.
+"""
+
+import re
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from keyword_matcher import get_keyword_matcher
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9_]+")
+
+_STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "had", "her",
+    "was", "one", "our", "out", "has", "have", "this", "that", "with", "from", "they",
+    "will", "would", "there", "their", "what", "when", "which", "been", "into", "than",
+    "then", "them", "these", "some", "could", "please", "thanks", "regards", "dear",
+    "hello", "also", "just", "very", "your", "about"
+}
+
+# Chatbot history lines ("Bot: ...") and signatures carry little signal
+_LOW_SIGNAL_PREFIXES = ("bot:", "ticket created via", "regards", "thanks", "sent from")
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences / lines"""
+    return [sentence.strip() for sentence in _SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+def token_lengths(tokenizer, pieces: Sequence[str]) -> List[int]:
+    """Token count of each piece (without special tokens), in one tokenizer call"""
+    if not pieces:
+        return []
+    return [len(ids) for ids in tokenizer(list(pieces), add_special_tokens=False)["input_ids"]]
+
+def sentence_score(sentence: str) -> float:
+    """
+    Heuristic informativeness: rule keyword hits (priority, category and intent
+    tables), identifiers/error codes, and distinct content words
+    """
+    hits = get_keyword_matcher().scan(sentence)
+    keyword_hits = sum(len(keywords) for keywords in hits.values())
+
+    words = _WORD.findall(sentence.lower())
+    content = {word for word in words if len(word) > 2 and word not in _STOPWORDS}
+    codes = sum(1 for word in content if any(char.isdigit() for char in word))
+
+    score = 2.0 * keyword_hits + 1.5 * codes + len(content) / np.sqrt(1 + len(words))
+    if sentence.lower().startswith(_LOW_SIGNAL_PREFIXES):
+        score *= 0.25
+    return score
+
+def _fits(text: str, max_tokens: int) -> bool:
+    """Cheap check: ASCII text never has more byte-level BPE tokens than characters"""
+    return text.isascii() and len(text) <= max_tokens
+
+def _truncate_words(tokenizer, sentence: str, max_tokens: int) -> str:
+    """Cut a single over-long sentence at a word boundary"""
+    words = sentence.split()
+    lengths = token_lengths(tokenizer, [" " + word for word in words])
+    kept, used = [], 0
+    for word, length in zip(words, lengths):
+        if used + length > max_tokens:
+            break
+        kept.append(word)
+        used += length
+    return " ".join(kept)
+
+def _split_subject(text: str, subject: Optional[str]):
+    """Use the explicit subject, or the first line of a multi-line text"""
+    if subject is not None:
+        return subject.strip(), text
+    stripped = text.strip()
+    if "\n" in stripped:
+        first, rest = stripped.split("\n", 1)
+        return first.strip(), rest
+    return "", stripped
+
+def fit_to_budget(text: str, tokenizer, max_tokens: int, subject: Optional[str] = None) -> str:
+    """
+    Return `text` unchanged if it fits in `max_tokens`, otherwise the subject
+    plus the highest-scoring sentences that fit, in their original order
+    """
+    if max_tokens <= 0 or _fits(text, max_tokens):
+        return text
+
+    subject, body = _split_subject(text, subject)
+    sentences = split_sentences(body)
+    subject_length = token_lengths(tokenizer, [subject])[0] if subject else 0
+    lengths = token_lengths(tokenizer, sentences)
+
+    if subject_length + sum(lengths) <= max_tokens:
+        return text
+
+    if subject_length >= max_tokens:
+        return _truncate_words(tokenizer, subject, max_tokens)
+
+    budget = max_tokens - subject_length
+    scores = [sentence_score(sentence) for sentence in sentences]
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+
+    keep, used = [], 0
+    for i in ranked:
+        if used + lengths[i] <= budget:
+            keep.append(i)
+            used += lengths[i]
+
+    if keep:
+        body = " ".join(sentences[i] for i in sorted(keep))
+    elif sentences:
+        body = _truncate_words(tokenizer, sentences[ranked[0]], budget)
+    else:
+        body = ""
+
+    return f"{subject}\n{body}".strip() if subject else body
+
+def chunk_text(
+    text: str,
+    tokenizer,
+    max_tokens: int,
+    max_chunks: int,
+    subject: Optional[str] = None
+) -> List[str]:
+    """
+    Split `text` into consecutive chunks of whole sentences, each within
+    `max_tokens` and each prefixed with the subject. If there are more than
+    `max_chunks` chunks, only the most informative ones are kept.
+    """
+    if max_tokens <= 0 or _fits(text, max_tokens):
+        return [text]
+
+    subject, body = _split_subject(text, subject)
+    sentences = split_sentences(body)
+    subject_length = token_lengths(tokenizer, [subject])[0] if subject else 0
+    lengths = token_lengths(tokenizer, sentences)
+
+    if subject_length + sum(lengths) <= max_tokens:
+        return [text]
+
+    budget = max(1, max_tokens - subject_length)
+    chunks: List[List[str]] = []
+    current, used = [], 0
+    for sentence, length in zip(sentences, lengths):
+        if length > budget:
+            sentence, length = _truncate_words(tokenizer, sentence, budget), budget
+        if current and used + length > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(sentence)
+        used += length
+    if current:
+        chunks.append(current)
+
+    if len(chunks) > max_chunks > 0:
+        chunk_scores = [sum(sentence_score(sentence) for sentence in chunk) for chunk in chunks]
+        best = sorted(range(len(chunks)), key=lambda i: (-chunk_scores[i], i))[:max_chunks]
+        chunks = [chunks[i] for i in sorted(best)]
+
+    texts = [" ".join(chunk) for chunk in chunks]
+    return [f"{subject}\n{chunk}" for chunk in texts] if subject else texts
+
+def pool_scores(scores: np.ndarray, method: str = "mean") -> np.ndarray:
+    """Pool per-chunk label distributions (chunks, labels) into one distribution"""
+    pooled = scores.max(axis=0) if method == "max" else scores.mean(axis=0)
+    return pooled / pooled.sum()
+
+def make_snippet(text: str, max_chars: int) -> str:
+    """Leading `max_chars` of `text`, cut at a word boundary"""
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars + 1].rsplit(" ", 1)[0] if " " in text[:max_chars + 1] else text[:max_chars]
+    return cut.rstrip(" ,;:") + "..."
+
+def select_fields(articles: List[dict], fields: str, max_chars: int) -> List[dict]:
+    """
+    Give every KB result a snippet (the content lead unless one was already
+    set) and, for fields="snippet", drop the full content
+    """
+    for article in articles:
+        if article.get("snippet") is None:
+            article["snippet"] = make_snippet(article.get("content") or "", max_chars)
+        if fields == "snippet":
+            article.pop("content", None)
+    return articles
@@ -0,0 +1,561 @@
+"""
+Vector indexes for knowledge-base search.
+
+All indexes work on L2-normalized float32 vectors and rank by inner product
+(= cosine similarity). Keys are integer ids chosen by the caller.
+
+- ExactIndex: brute force, one matrix product per batch of queries;
+  float32, float16 or int8 storage with optional float32 rescoring
+- IVFIndex: inverted-file index (spherical k-means coarse quantizer, NumPy only).
+  `nprobe` trades recall for latency; nprobe == nlist is an exact search.
+- IVFSubset: a subset of an IVFIndex's keys (e.g. one KB category), searched
+  through the parent's lists without a copy of its vectors
+"""
+
+import logging
+import math
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows per block when scoring large matrices, to bound temporary memory
+_BLOCK_ROWS = 65536
+
+class VectorIndex(ABC):
+    """Common interface for vector indexes"""
+
+    kind = "base"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        # Caller-defined identity of the indexed data, persisted by save()
+        self.fingerprint = ""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of indexed vectors"""
+
+    @abstractmethod
+    def add(self, keys: np.ndarray, vectors: np.ndarray):
+        """Index `vectors` under `keys`"""
+
+    @abstractmethod
+    def remove(self, keys: np.ndarray):
+        """Drop the vectors stored under `keys` (unknown keys are ignored)"""
+
+    @abstractmethod
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, keys), both shaped (queries, k) and sorted best first.
+        Missing results are padded with score -inf and key -1.
+        """
+
+def _save_npz(path: str, **arrays):
+    """
+    np.savez to exactly `path` (through a file handle, so no ".npz" is
+    appended), written to a temporary file and swapped in atomically
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def _empty_results(n_queries: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    return (
+        np.full((n_queries, k), -np.inf, dtype=np.float32),
+        np.full((n_queries, k), -1, dtype=np.int64)
+    )
+
+def _top_k(scores: np.ndarray, keys: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best-first top-k of a (queries, candidates) score matrix, padded to k"""
+    n_queries, n = scores.shape
+    out_scores, out_keys = _empty_results(n_queries, k)
+    take = min(k, n)
+    if take == 0:
+        return out_scores, out_keys
+
+    if take < n:
+        top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+    else:
+        top = np.tile(np.arange(n), (n_queries, 1))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+
+    out_scores[:, :take] = np.take_along_axis(top_scores, order, axis=1)
+    out_keys[:, :take] = keys[top]
+    # Candidates masked out with -inf count as missing
+    out_keys[np.isneginf(out_scores)] = -1
+    return out_scores, out_keys
+
+# Storage types supported by ExactIndex
+DTYPES = ("float32", "float16", "int8")
+
+# Candidates fetched per requested result before float32 rescoring
+RESCORE_FACTOR = 4
+
+# Rows dequantized at a time while scoring a quantized matrix
+_DEQUANT_BLOCK_ROWS = 4096
+
+class ExactIndex(VectorIndex):
+    """
+    Brute-force index over a contiguous (growable) matrix.
+
+    `dtype="float32"` stores vectors as given; "float16" halves the memory and
+    "int8" (symmetric scalar quantization, one scale per row) quarters it.
+    NumPy has no fp16/int8 matrix product, so quantized rows are dequantized
+    block by block while scoring. With a `rescore_source` (float32 rows
+    indexed by key, e.g. the memory-mapped embedding store) the top
+    `k * RESCORE_FACTOR` candidates are re-ranked with exact float32 scores.
+    """
+
+    kind = "exact"
+
+    def __init__(self, dim: int, dtype: str = "float32", rescore_source: Optional[np.ndarray] = None):
+        super().__init__(dim)
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported index dtype '{dtype}', expected one of {DTYPES}")
+        self.dtype = dtype
+        self.rescore_source = rescore_source
+        self._vectors = np.zeros((0, dim), dtype=dtype)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        # float32 rows added after the rescore source was captured, by key
+        self._fresh: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def quantized(self) -> bool:
+        return self.dtype != "float32"
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Indexed vectors as float32 (a view when stored unquantized)"""
+        stored = self._vectors[:self._size]
+        if not self.quantized:
+            return stored
+        vectors = stored.astype(np.float32)
+        if self.dtype == "int8":
+            vectors *= self._scales[:self._size, None]
+        return vectors
+
+    @property
+    def keys(self) -> np.ndarray:
+        return self._keys[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the stored vectors (and int8 scales)"""
+        return self._vectors[:self._size].nbytes + (self._scales[:self._size].nbytes if self.dtype == "int8" else 0)
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert float32 rows to the storage dtype; returns (rows, int8 scales)"""
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(self.dtype, copy=False), np.ones(len(vectors), dtype=np.float32)
+
+    def add(self, keys: np.ndarray, vectors: np.ndarray):
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        stored, scales = self._encode(vectors)
+        needed = self._size + len(keys)
+
+        if needed > len(self._keys):
+            # Grow geometrically so incremental adds are amortized O(1)
+            capacity = max(needed, int(len(self._keys) * 1.5) + 16)
+            grown_vectors = np.zeros((capacity, self.dim), dtype=self.dtype)
+            grown_scales = np.ones(capacity, dtype=np.float32)
+            grown_keys = np.full(capacity, -1, dtype=np.int64)
+            grown_vectors[:self._size] = self._vectors[:self._size]
+            grown_scales[:self._size] = self._scales[:self._size] if self.dtype == "int8" else 1.0
+            grown_keys[:self._size] = self.keys
+            self._vectors, self._scales, self._keys = grown_vectors, grown_scales, grown_keys
+
+        self._vectors[self._size:needed] = stored
+        if self.dtype == "int8":
+            self._scales[self._size:needed] = scales
+        self._keys[self._size:needed] = keys
+        self._size = needed
+
+        if self.rescore_source is not None:
+            self._fresh.update(zip(keys.tolist(), vectors.copy()))
+
+    def remove(self, keys: np.ndarray):
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1)
+        keep = ~np.isin(self.keys, keys)
+        if keep.all():
+            return
+        self._vectors = self._vectors[:self._size][keep]
+        if self.dtype == "int8":
+            self._scales = self._scales[:self._size][keep]
+        self._keys = self.keys[keep]
+        self._size = len(self._keys)
+        for key in keys.tolist():
+            self._fresh.pop(key, None)
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """(queries, rows) inner products against the stored rows"""
+        stored = self._vectors[:self._size]
+        if not self.quantized:
+            return queries @ stored.T
+
+        scores = np.empty((len(queries), self._size), dtype=np.float32)
+        for start in range(0, self._size, _DEQUANT_BLOCK_ROWS):
+            block = stored[start:start + _DEQUANT_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self.dtype == "int8":
+            scores *= self._scales[:self._size]
+        return scores
+
+    def _rescore_vectors(self, keys: np.ndarray) -> np.ndarray:
+        """float32 rows for `keys` from the rescore source (or rows added since)"""
+        return np.stack([
+            self._fresh[key] if key in self._fresh else np.asarray(self.rescore_source[key], dtype=np.float32)
+            for key in keys.tolist()
+        ])
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """`allowed` (sorted unique keys) restricts the results to those keys"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self._size == 0:
+            return _empty_results(len(queries), k)
+        scores = self._scores(queries)
+        if allowed is not None:
+            scores[:, ~np.isin(self.keys, allowed, assume_unique=True)] = -np.inf
+        if not self.quantized or self.rescore_source is None:
+            return _top_k(scores, self.keys, k)
+
+        candidate_scores, candidate_keys = _top_k(scores, self.keys, k * RESCORE_FACTOR)
+        scores, keys = _empty_results(len(queries), k)
+        for q, (query, row_keys) in enumerate(zip(queries, candidate_keys)):
+            row_keys = row_keys[row_keys >= 0]
+            exact = self._rescore_vectors(row_keys) @ query
+            top_scores, top_keys = _top_k(exact[None, :], row_keys, k)
+            scores[q], keys[q] = top_scores[0], top_keys[0]
+        return scores, keys
+
+    def slice(self, start: int, end: int) -> "ExactIndex":
+        """Index over rows [start, end) sharing this index's storage (no copy)"""
+        part = ExactIndex(self.dim, self.dtype, self.rescore_source)
+        part._vectors = self._vectors[start:end]
+        part._scales = self._scales[start:end]
+        part._keys = self._keys[start:end]
+        part._size = len(part._keys)
+        part._fresh = self._fresh
+        return part
+
+    def save(self, path: str):
+        _save_npz(
+            path, kind=self.kind, dim=self.dim, fingerprint=self.fingerprint,
+            dtype=self.dtype, keys=self.keys, vectors=self.vectors
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        keys: np.ndarray,
+        vectors: np.ndarray,
+        dtype: str = "float32",
+        rescore_source: Optional[np.ndarray] = None
+    ) -> "ExactIndex":
+        """
+        Wrap existing arrays without copying when they are already contiguous
+        float32 (e.g. a read-only memory map shared between workers). The first
+        add() after that copies into a private, growable buffer. Quantized
+        dtypes always build their own (smaller) copy.
+        """
+        index = cls(vectors.shape[1], dtype, rescore_source)
+        if dtype == "float32":
+            index._vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            index._keys = np.ascontiguousarray(keys, dtype=np.int64)
+            index._size = len(index._keys)
+        elif len(keys):
+            stored, scales = index._encode(np.asarray(vectors, dtype=np.float32))
+            index._vectors, index._scales = stored, scales
+            index._keys = np.ascontiguousarray(keys, dtype=np.int64)
+            index._size = len(index._keys)
+        return index
+
+def _spherical_kmeans(vectors: np.ndarray, k: int, iterations: int, seed: int) -> np.ndarray:
+    """k-means on the unit sphere (cosine); returns (k, dim) normalized centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=k)
+
+        # Re-seed empty clusters with random points
+        empty = np.where(counts == 0)[0]
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: vectors are bucketed by their nearest k-means
+    centroid and a query only scans the `nprobe` closest buckets.
+
+    Vectors added before the index is trained are kept in a staging buffer
+    (and searched exactly); once `nlist * min_points_per_list` vectors are
+    available the quantizer is trained and the buffer distributed. Later adds
+    go straight into their bucket, so the index builds incrementally.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        dim: int,
+        nlist: int = 0,
+        nprobe: int = 8,
+        train_iterations: int = 20,
+        min_points_per_list: int = 39,
+        seed: int = 0,
+        dtype: str = "float32"
+    ):
+        super().__init__(dim)
+        self.dtype = dtype
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iterations = train_iterations
+        self.min_points_per_list = min_points_per_list
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[ExactIndex] = []
+        self._staging = ExactIndex(dim, dtype)
+        self._list_of_key = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._staging) + sum(len(bucket) for bucket in self.lists)
+
+    def train(self, vectors: np.ndarray):
+        """Fit the coarse quantizer (on at most 256 points per list)"""
+        nlist = self.nlist or max(1, int(4 * math.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+        sample_size = min(len(vectors), nlist * 256)
+        rng = np.random.default_rng(self.seed)
+        sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+
+        logger.info(f"Training IVF quantizer: {nlist} lists on {sample_size} vectors")
+        self.set_centroids(_spherical_kmeans(sample, nlist, self.train_iterations, self.seed))
+
+    def set_centroids(self, centroids: np.ndarray):
+        """Use an already trained coarse quantizer (e.g. from a saved index) instead of training"""
+        self.nlist = len(centroids)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.lists = [ExactIndex(self.dim, self.dtype) for _ in range(self.nlist)]
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), _BLOCK_ROWS):
+            block = vectors[start:start + _BLOCK_ROWS]
+            assignment[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignment
+
+    def add(self, keys: np.ndarray, vectors: np.ndarray):
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+
+        if not self.is_trained:
+            self._staging.add(keys, vectors)
+            target = (self.nlist or 1) * self.min_points_per_list
+            if len(self._staging) >= target:
+                staged_keys, staged_vectors = self._staging.keys.copy(), self._staging.vectors.copy()
+                self._staging = ExactIndex(self.dim, self.dtype)
+                self.train(staged_vectors)
+                self._add_to_lists(staged_keys, staged_vectors)
+            return
+
+        self._add_to_lists(keys, vectors)
+
+    def _add_to_lists(self, keys: np.ndarray, vectors: np.ndarray):
+        assignment = self._assign(vectors)
+        for list_id in np.unique(assignment):
+            members = assignment == list_id
+            self.lists[list_id].add(keys[members], vectors[members])
+        self._list_of_key.update(zip(keys.tolist(), assignment.tolist()))
+
+    def remove(self, keys: np.ndarray):
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1)
+        self._staging.remove(keys)
+        by_list = {}
+        for key in keys.tolist():
+            list_id = self._list_of_key.pop(key, None)
+            if list_id is not None:
+                by_list.setdefault(list_id, []).append(key)
+        for list_id, list_keys in by_list.items():
+            self.lists[list_id].remove(np.array(list_keys, dtype=np.int64))
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search the `nprobe` nearest lists (all lists when nprobe >= nlist),
+        only returning keys in `allowed` (sorted unique keys) when given
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        scores, keys = self._staging.search(queries, k, allowed)
+        if not self.is_trained:
+            return scores, keys
+
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.tile(np.arange(self.nlist), (len(queries), 1))
+
+        for q, query in enumerate(queries):
+            candidate_scores = [scores[q]]
+            candidate_keys = [keys[q]]
+            for list_id in probes[q]:
+                bucket = self.lists[list_id]
+                if len(bucket):
+                    list_scores, list_keys = bucket.search(query[None, :], k, allowed)
+                    candidate_scores.append(list_scores[0])
+                    candidate_keys.append(list_keys[0])
+            merged_scores, merged_keys = _top_k(
+                np.concatenate(candidate_scores)[None, :], np.concatenate(candidate_keys), k
+            )
+            scores[q], keys[q] = merged_scores[0], merged_keys[0]
+
+        return scores, keys
+
+    def save(self, path: str):
+        all_keys = [bucket.keys for bucket in self.lists]
+        all_vectors = [bucket.vectors for bucket in self.lists]
+        offsets = np.cumsum([0] + [len(k) for k in all_keys])
+        _save_npz(
+            path,
+            kind=self.kind,
+            dim=self.dim,
+            fingerprint=self.fingerprint,
+            dtype=self.dtype,
+            nlist=self.nlist,
+            nprobe=self.nprobe,
+            centroids=self.centroids if self.is_trained else np.zeros((0, self.dim), dtype=np.float32),
+            keys=np.concatenate(all_keys) if all_keys else np.zeros(0, dtype=np.int64),
+            vectors=np.concatenate(all_vectors) if all_vectors else np.zeros((0, self.dim), dtype=np.float32),
+            offsets=offsets,
+            staging_keys=self._staging.keys,
+            staging_vectors=self._staging.vectors
+        )
+
+class IVFSubset(VectorIndex):
+    """
+    The keys of an IVFIndex that belong to one subset (e.g. a KB category).
+    Searches go through the parent's lists with results filtered to the
+    subset, so the subset holds no vectors of its own: add() and remove()
+    only track keys, the vectors are added to / removed from the parent.
+    """
+
+    kind = "ivf_subset"
+
+    def __init__(self, parent: IVFIndex, keys: Optional[np.ndarray] = None):
+        super().__init__(parent.dim)
+        self.parent = parent
+        self._keys = np.unique(np.asarray(keys if keys is not None else [], dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def keys(self) -> np.ndarray:
+        return self._keys
+
+    @property
+    def nlist(self) -> int:
+        return self.parent.nlist
+
+    def add(self, keys: np.ndarray, vectors: Optional[np.ndarray] = None):
+        self._keys = np.union1d(self._keys, np.asarray(keys, dtype=np.int64))
+
+    def remove(self, keys: np.ndarray):
+        self._keys = np.setdiff1d(self._keys, np.asarray(keys, dtype=np.int64))
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Filtered search of the parent's `nprobe` nearest lists; a small subset
+        may have fewer than `k` keys there (nprobe == nlist always finds them)
+        """
+        if len(self._keys) == 0:
+            return _empty_results(len(np.atleast_2d(queries)), k)
+        return self.parent.search(queries, k, nprobe=nprobe, allowed=self._keys)
+
+def load_index(path: str) -> VectorIndex:
+    """Load an index written by `save()`"""
+    data = np.load(path, allow_pickle=False)
+    kind = str(data["kind"])
+    dim = int(data["dim"])
+    dtype = str(data["dtype"]) if "dtype" in data else "float32"
+
+    if kind == ExactIndex.kind:
+        index = ExactIndex.from_arrays(data["keys"], data["vectors"].reshape(-1, dim), dtype)
+        index.fingerprint = str(data["fingerprint"])
+        return index
+
+    index = IVFIndex(dim, nlist=int(data["nlist"]), nprobe=int(data["nprobe"]), dtype=dtype)
+    if len(data["centroids"]):
+        index.centroids = data["centroids"]
+        index.lists = [ExactIndex(dim, dtype) for _ in range(index.nlist)]
+        offsets, keys, vectors = data["offsets"], data["keys"], data["vectors"]
+        for list_id in range(index.nlist):
+            start, end = offsets[list_id], offsets[list_id + 1]
+            if end > start:
+                index.lists[list_id].add(keys[start:end], vectors[start:end])
+                index._list_of_key.update((key, list_id) for key in keys[start:end].tolist())
+    index._staging.add(data["staging_keys"], data["staging_vectors"].reshape(-1, dim))
+    index.fingerprint = str(data["fingerprint"])
+    return index
+
+def measure_recall(
+    index: VectorIndex,
+    exact: VectorIndex,
+    queries: np.ndarray,
+    k: int = 10
+) -> float:
+    """Mean recall@k of `index` against exact search for the given queries"""
+    _, approx_keys = index.search(queries, k)
+    _, exact_keys = exact.search(queries, k)
+    recalls = []
+    for approx_row, exact_row in zip(approx_keys, exact_keys):
+        truth = set(exact_row[exact_row >= 0].tolist())
+        if truth:
+            recalls.append(len(truth & set(approx_row.tolist())) / len(truth))
+    return float(np.mean(recalls)) if recalls else 1.0
@@ -21,7 +21,8 @@ export interface Ticket {
 export interface KBArticle {
   id: string
   title: string
-  content: string
+  content?: string
+  snippet?: string
   category: string
   views?: number
   helpful_count?: number
@@ -21,6 +21,8 @@ CREATE TABLE IF NOT EXISTS knowledge_base (
     category VARCHAR(50) NOT NULL,
     keywords TEXT[],
     embedding VECTOR(384),  -- For sentence-transformers embeddings
+    content_hash TEXT,  -- md5 of the embedded text (title + content) when embedded
+    embedding_model TEXT,  -- Model that produced the embedding
     views INTEGER DEFAULT 0,
     helpful_count INTEGER DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
@@ -47,5 +49,13 @@ $$ language 'plpgsql';
 CREATE TRIGGER update_tickets_updated_at BEFORE UPDATE ON tickets
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- KB updated_at tracks content changes only (the search cache refreshes from it);
+-- views/helpful_count updates leave it alone
 CREATE TRIGGER update_kb_updated_at BEFORE UPDATE ON knowledge_base
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title
+          OR OLD.content IS DISTINCT FROM NEW.content
+          OR OLD.category IS DISTINCT FROM NEW.category
+          OR OLD.keywords IS DISTINCT FROM NEW.keywords
+          OR OLD.embedding IS DISTINCT FROM NEW.embedding)
+    EXECUTE FUNCTION update_updated_at_column();
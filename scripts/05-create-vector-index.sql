@@ -0,0 +1,15 @@
+-- Approximate nearest-neighbour index for database-side KB search
+-- (SEARCH_BACKEND=database, or auto above DB_SEARCH_MIN_ARTICLES articles).
+-- Requires pgvector >= 0.5.0 for HNSW.
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- Cosine distance, matching `ORDER BY embedding <=> query` in KnowledgeBaseModel.search_by_vector
+CREATE INDEX IF NOT EXISTS idx_kb_embedding_hnsw ON knowledge_base
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
+
+-- On pgvector < 0.5.0 use IVFFlat instead (build it after embeddings are generated):
+-- CREATE INDEX IF NOT EXISTS idx_kb_embedding_ivfflat ON knowledge_base
+--     USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+
+ANALYZE knowledge_base;
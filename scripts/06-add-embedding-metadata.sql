@@ -0,0 +1,5 @@
+-- Track what each KB embedding was computed from, so re-embedding only touches
+-- articles whose title/content changed or that were embedded by another model
+-- (see scripts/04-generate-embeddings.py). Safe to run more than once.
+ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS embedding_model TEXT;
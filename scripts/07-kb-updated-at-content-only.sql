@@ -0,0 +1,13 @@
+-- Only bump knowledge_base.updated_at when an article's content or embedding
+-- changes, not on view/helpful counts: the search cache's incremental refresh
+-- treats every row with a newer updated_at as edited. Safe to run more than once.
+DROP TRIGGER IF EXISTS update_kb_updated_at ON knowledge_base;
+
+CREATE TRIGGER update_kb_updated_at BEFORE UPDATE ON knowledge_base
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title
+          OR OLD.content IS DISTINCT FROM NEW.content
+          OR OLD.category IS DISTINCT FROM NEW.category
+          OR OLD.keywords IS DISTINCT FROM NEW.keywords
+          OR OLD.embedding IS DISTINCT FROM NEW.embedding)
+    EXECUTE FUNCTION update_updated_at_column();